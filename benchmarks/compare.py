@@ -0,0 +1,34 @@
+"""
+Compares two results files written by benchmarks.run:
+
+    python -m benchmarks.compare old.json new.json
+"""
+
+import sys
+import json
+
+
+def _load(path: str):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def main():
+    old, new = _load(sys.argv[1]), _load(sys.argv[2])
+    sys.stdout.write(f"{old.get('commit')} -> {new.get('commit')}\n")
+
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            sys.stdout.write(f"{name:<28} {'(new)':>10}\n")
+            continue
+
+        before = old["results"][name]["median"]
+        after = result["median"]
+        sys.stdout.write(
+            f"{name:<28} {before * 1000:>10.2f} ms -> {after * 1000:>10.2f} ms"
+            f" ({after / before:>5.2f}x)\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
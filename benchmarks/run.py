@@ -0,0 +1,238 @@
+"""
+Synthetic-scale benchmarks of the whole pipeline.
+
+    python -m benchmarks.run --out results.json [--plugins 200 --files 1000 ...]
+    python -m benchmarks.compare old.json new.json
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+import yaml
+
+from benchmarks import synthetic
+from dots import context
+from dots.config import builder
+from dots.util import diff, fs, logger
+from dots.yaml import enrich, loader
+
+
+def _time(function, repeats: int, setup=None):
+    timings = []
+
+    for _ in range(repeats):
+        # Iterations must not reuse stat results of the previous ones
+        fs.reset_stat_cache()
+        argument = setup() if setup is not None else None
+        started = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "repeats": repeats,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _init(config_path: str, dry_run: bool) -> None:
+    logger.override_logger(logger.StdErrLogger())
+    context.override_context(
+        context.Context(
+            config_path=config_path,
+            dottools_root=os.path.dirname(os.path.dirname(config_path)),
+            dry_run=dry_run,
+        )
+    )
+    loader.add_common_yaml_constructors(context.context().cfg_dir, {})
+
+
+def _bench_config(args, workdir: str):
+    config_path = synthetic.write_config(
+        root=os.path.join(workdir, "config"),
+        home=os.path.join(workdir, "home"),
+        plugins=args.plugins,
+        from_depth=args.from_depth,
+        list_size=args.list_size,
+        fan_out=args.fan_out,
+    )
+
+    def parse(_):
+        with open(config_path, "r", encoding="utf-8") as file:
+            return yaml.safe_load(file)
+
+    raw = parse(None)
+    enriched = enrich.enrich_obj(copy.deepcopy(raw))
+
+    return {
+        "load_rich_yaml_from": _time(
+            lambda _: loader.load_rich_yaml_from(config_path), args.repeats
+        ),
+        "yaml_parse": _time(parse, args.repeats),
+        "enrich_obj": _time(
+            enrich.enrich_obj, args.repeats, setup=lambda: copy.deepcopy(raw)
+        ),
+        "create_config": _time(lambda _: builder.create_config(enriched), args.repeats),
+    }
+
+
+def _bench_dir(args, workdir: str):
+    from dots.plugins.dir import Dir
+
+    src = os.path.join(workdir, "tree", "src")
+    dst = os.path.join(workdir, "tree", "dst")
+    synthetic.write_tree(
+        src,
+        dst,
+        files=args.files,
+        size=args.file_size,
+        change_ratio=args.change_ratio,
+    )
+
+    target = os.path.join(workdir, "tree", "target")
+
+    def fresh_plugin():
+        if os.path.exists(target):
+            shutil.rmtree(target)
+
+        shutil.copytree(dst, target)
+        # The target has been replaced behind the fs layer's back
+        fs.reset_stat_cache()
+        plugin = Dir(builder.create_config({"src": src, "dst": target}))
+        plugin.build()
+        return plugin
+
+    def diff_and_apply(plugin):
+        list(plugin.difference())
+        plugin.apply()
+
+    context.context().dry_run = True
+    diff_result = _time(
+        lambda plugin: list(plugin.difference()), args.repeats, setup=fresh_plugin
+    )
+
+    context.context().dry_run = False
+    apply_result = _time(diff_and_apply, args.repeats, setup=fresh_plugin)
+    context.context().dry_run = True
+
+    return {
+        "dir_difference": diff_result,
+        "dir_difference_and_apply": apply_result,
+    }
+
+
+def _bench_generate(args, workdir: str):
+    from dots.plugins.generate import Generate
+
+    template = os.path.join(workdir, "templates", "template.j2")
+    synthetic.write_template(template, variables=args.variables)
+
+    plugin = Generate(
+        builder.create_config(
+            {
+                "template": template,
+                "variables": {f"var{i}": i for i in range(args.variables)},
+            }
+        )
+    )
+
+    return {
+        "generate_render": _time(lambda _: plugin.build(), args.repeats),
+    }
+
+
+def _bench_diff(args, _):
+    rng = random.Random(0)
+    old = synthetic.random_lines(rng, args.diff_size)
+    new = list(old)
+
+    for _ in range(max(1, int(len(new) * args.change_ratio))):
+        new[rng.randrange(len(new))] = synthetic.random_lines(rng, 60)[0]
+
+    return {
+        "get_diff_lines": _time(lambda _: diff.get_diff_lines(old, new), args.repeats),
+    }
+
+
+BENCHMARKS = {
+    "config": _bench_config,
+    "dir": _bench_dir,
+    "generate": _bench_generate,
+    "diff": _bench_diff,
+}
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="dottools synthetic benchmarks")
+    parser.add_argument("--out", help="Write results as JSON to the file")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--only",
+        help="Comma separated benchmarks to run",
+        default=",".join(BENCHMARKS),
+    )
+    parser.add_argument("--plugins", type=int, default=100)
+    parser.add_argument("--from-depth", type=int, default=3)
+    parser.add_argument("--list-size", type=int, default=10)
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--file-size", type=int, default=4096)
+    parser.add_argument("--change-ratio", type=float, default=0.1)
+    parser.add_argument("--variables", type=int, default=1000)
+    parser.add_argument("--diff-size", type=int, default=1024 * 1024)
+    return parser.parse_args()
+
+
+def main():
+    args = _parse_args()
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="dots-bench-") as workdir:
+        _init(os.path.join(workdir, "config", "conf", "config.yaml"), dry_run=True)
+
+        for name in args.only.split(","):
+            results.update(BENCHMARKS[name](args, workdir))
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "params": {
+            key: value for key, value in vars(args).items() if key not in {"out"}
+        },
+        "results": results,
+    }
+
+    for name, result in results.items():
+        sys.stdout.write(f"{name:<28} median {result['median'] * 1000:>10.2f} ms\n")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
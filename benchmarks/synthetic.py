@@ -0,0 +1,139 @@
+"""
+Generators of synthetic configurations and home trees for benchmarks
+"""
+
+import os
+import random
+import string
+
+import yaml
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def _random_line(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(string.ascii_letters + " ") for _ in range(length)) + "\n"
+
+
+def random_lines(rng: random.Random, size: int, line_length: int = 60):
+    """
+    Returns lines of random text of about size bytes in total
+    """
+    return [_random_line(rng, line_length) for _ in range(max(1, size // line_length))]
+
+
+def _inherited_object(depth: int, list_size: int):
+    """
+    Returns an object built of a chain of depth _from merges,
+    each level contributing list_size list items
+    """
+    obj = {
+        "level": 0,
+        "items": [f"item-0-{i}" for i in range(list_size)],
+    }
+
+    for level in range(1, depth + 1):
+        obj = {
+            "_from": [obj],
+            "level": level,
+            "items": [f"item-{level}-{i}" for i in range(list_size)],
+        }
+
+    return obj
+
+
+def _shellrc_plugin(home: str, index: int, list_size: int):
+    return {
+        "plug.Shellrc": {
+            "dst": os.path.join(home, f"shellrc-{index}"),
+            "minimal": True,
+            "env": {f"VAR_{index}_{i}": f"value-{i}" for i in range(list_size)},
+            "aliases": {f"alias{index}_{i}": f"echo {i}" for i in range(list_size)},
+            "path": [f"/opt/bin-{index}-{i}" for i in range(list_size)],
+        }
+    }
+
+
+def write_config(
+    root: str,
+    home: str,
+    plugins: int = 10,
+    from_depth: int = 3,
+    list_size: int = 10,
+    fan_out: int = 4,
+) -> str:
+    """
+    Writes a configuration with plugins spread over fan_out included
+    fragments and returns path of the root file. The include base
+    directory (see Context.cfg_dir) is root
+    """
+
+    fragments = {}
+
+    for fragment in range(fan_out):
+        fragments[f"fragment-{fragment}"] = {
+            "inherited": _inherited_object(from_depth, list_size),
+            "plugins": {},
+        }
+
+    for index in range(plugins):
+        fragment = fragments[f"fragment-{index % fan_out}"]
+        fragment["plugins"][f"plugin-{index}"] = _shellrc_plugin(home, index, list_size)
+
+    root_lines = []
+    for name, fragment in fragments.items():
+        _write(
+            os.path.join(root, "fragments", f"{name}.yaml"),
+            yaml.safe_dump(fragment),
+        )
+        root_lines.append(f"{name}: !include fragments/{name}.yaml\n")
+
+    config_path = os.path.join(root, "conf", "config.yaml")
+    _write(config_path, "".join(root_lines))
+    return config_path
+
+
+def write_tree(
+    src: str,
+    dst: str,
+    files: int = 100,
+    size: int = 4096,
+    change_ratio: float = 0.1,
+    seed: int = 0,
+) -> None:
+    """
+    Writes files source files into src and their copies into dst,
+    change_ratio of which differ from the source
+    """
+
+    rng = random.Random(seed)
+
+    for index in range(files):
+        relpath = os.path.join(f"dir-{index % 10}", f"file-{index}.txt")
+        lines = random_lines(rng, size)
+        _write(os.path.join(src, relpath), "".join(lines))
+
+        if rng.random() < change_ratio:
+            changed = list(lines)
+            changed[rng.randrange(len(changed))] = _random_line(rng, 60)
+            lines = changed
+
+        _write(os.path.join(dst, relpath), "".join(lines))
+
+
+def write_template(path: str, variables: int = 100) -> None:
+    """
+    Writes a jinja2 template iterating over variables of the plugin config
+    """
+
+    _write(
+        path,
+        "{% for key, value in cfg.get('variables').astype(dict).items() %}\n"
+        "{{ key }} = {{ value }}\n"
+        "{% endfor %}\n" + "".join(f"static line {i}\n" for i in range(variables)),
+    )
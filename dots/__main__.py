@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import argparse
 
+from dots import client
 from dots.util import env
 from dots.util.logger import Tags
-from dots import dottools
+
+
+_TARGET_HELP = (
+    "Render outputs once and place them into the target instead of the home "
+    "directory, may be repeated. ROOT is a home directory, ROOT:HOME is a root "
+    "file system with the home directory at HOME inside it. Only destinations "
+    "are moved: content is rendered for this host (ctx.home, !rel), "
+    "configurations with symbolic links are rejected"
+)
 
 
 def _parse_args():
@@ -46,27 +56,292 @@ def _parse_args():
         choices=["yes", "no"],
         default="yes",
     )
+    parser.add_argument(
+        "--profile",
+        help="Print time spent in each phase and plugin at exit",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-json",
+        help="Write time spent in each phase and plugin to the file as JSON",
+        default=None,
+    )
+    parser.add_argument(
+        "--cprofile-out",
+        help="Run cProfile during loading and plugins' phases, write pstats to the file",
+        default=None,
+    )
+    parser.add_argument(
+        "--memory-profile",
+        help="Print peak and retained memory of each phase and plugin at exit",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--trace-out",
+        help="Write nested spans of the run to the file as Chrome trace events",
+        default=None,
+    )
+    parser.add_argument(
+        "--format",
+        help="Output of diff, plan and apply: log messages (text) or "
+        "a JSON record per change and plugin on stdout (ndjson)",
+        choices=["text", "ndjson"],
+        default="text",
+    )
+    parser.add_argument(
+        "--socket",
+        help="Unix socket of a `dots serve` server to forward commands to",
+        default=os.getenv(env.SOCKET_PATH_ENV_VAR),
+    )
+    parser.add_argument(
+        "--parse-jobs",
+        "-j",
+        help="Number of processes used to parse included yaml files",
+        default=1,
+        type=int,
+    )
 
     subparsers = parser.add_subparsers(title="Commands", dest="command")
     subparsers.add_parser("dump", help="Dump supplied yaml file")
-    subparsers.add_parser("diff", help="Show difference")
-    subparsers.add_parser("apply", help="Apply configuration")
-    subparsers.add_parser("compile", help="Show available plugins' configuration")
-    subparsers.add_parser(
+    diff_parser = subparsers.add_parser("diff", help="Show difference")
+    diff_parser.add_argument(
+        "--max-file-lines",
+        help="Show at most this many lines of difference of a single file",
+        default=None,
+        type=int,
+    )
+    diff_parser.add_argument(
+        "--max-lines",
+        help="Stop computing difference of a plugin after this many lines",
+        default=None,
+        type=int,
+    )
+    apply_parser = subparsers.add_parser("apply", help="Apply configuration")
+    apply_parser.add_argument(
+        "--target",
+        help=_TARGET_HELP,
+        action="append",
+        default=None,
+    )
+    apply_parser.add_argument(
+        "--backup",
+        help="Save overwritten and removed paths, so that `rollback` can restore them",
+        action="store_true",
+    )
+    apply_parser.add_argument(
+        "--plan",
+        help="Perform actions saved by `plan --out` instead of computing them "
+        "(the configuration is not read)",
+        default=None,
+    )
+    compile_parser = subparsers.add_parser(
+        "compile", help="Show available plugins' configuration"
+    )
+    compile_parser.add_argument(
+        "--hosts-file",
+        help="Render outputs of plugins for every host listed in the file "
+        "(name [config] [VAR=value ...] [ctx.attribute=value ...] per line)",
+        default=None,
+    )
+    compile_parser.add_argument(
+        "--out-dir",
+        help="Directory to render the hosts' outputs into, one subdirectory per host",
+        default=None,
+    )
+    compile_parser.add_argument(
+        "--host-jobs",
+        help="Number of processes to render the hosts in",
+        default=1,
+        type=int,
+    )
+    plan_parser = subparsers.add_parser(
         "plan", help="Print actions that will be done when apply is used"
     )
+    plan_parser.add_argument(
+        "--target",
+        help=_TARGET_HELP,
+        action="append",
+        default=None,
+    )
+    plan_parser.add_argument(
+        "--out",
+        help="Save the actions to the file to be performed later by `apply --plan`",
+        default=None,
+    )
 
-    return parser.parse_args()
+    rollback_parser = subparsers.add_parser(
+        "rollback",
+        help="Restore paths changed by an `apply --backup` run (list runs if none given)",
+    )
+    rollback_parser.add_argument(
+        "run_id",
+        help="Id of the run to roll back",
+        nargs="?",
+        default=None,
+    )
+    rollback_parser.add_argument(
+        "--dry-run",
+        "-n",
+        help="Only print paths that would be restored",
+        action="store_true",
+    )
+
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Write rendered outputs to a tar archive with a shell script applying them "
+        "(softlink directories are not supported)",
+    )
+    export_parser.add_argument(
+        "--out",
+        help="Path of the archive",
+        required=True,
+    )
+
+    subparsers.add_parser(
+        "serve",
+        help="Keep configuration loaded and serve commands over a unix socket",
+    )
+
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="Measure loading and difference of the configuration (dry-run)",
+    )
+    bench_parser.add_argument(
+        "--iterations",
+        "-k",
+        help="Number of runs, the first one is reported as cold",
+        default=10,
+        type=int,
+    )
+    bench_parser.add_argument(
+        "--out",
+        help="Write results to the file as JSON",
+        default=None,
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Apply configuration and re-apply it on changes of its inputs"
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        help="Seconds to wait for more changes before re-applying",
+        default=0.2,
+        type=float,
+    )
+    watch_parser.add_argument(
+        "--poll",
+        help="Poll files for changes instead of using inotify",
+        action="store_true",
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        help="Seconds between two polls",
+        default=0.5,
+        type=float,
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "compile" and args.hosts_file and not args.out_dir:
+        parser.error("--out-dir is required with --hosts-file")
+
+    return args
+
+
+def _forward_to_server(args, command):
+    return client.forward(
+        args.socket,
+        {
+            "command": command,
+            "config": os.path.realpath(args.config_file),
+            "field": args.field,
+            "log": args.log,
+            "color": args.color,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+        },
+    )
 
 
 def main(args):
+    command = args.command or "dump"
+
+    # Saved plans, targets, backups and diff limits are handled by this process only
+    local_only = (
+        (command == "plan" and (args.out or args.target))
+        or (command == "apply" and (args.plan or args.target or args.backup))
+        or (command == "diff" and (args.max_file_lines or args.max_lines))
+        or args.format != "text"
+    )
+
+    if args.socket and command in client.FORWARDED_COMMANDS and not local_only:
+        code = _forward_to_server(args, command)
+
+        if code is not None:
+            sys.exit(code)
+
+    from dots import dottools
+
+    if command == "rollback":
+        dottools.rollback(args.run_id, args.color, args.log, dry_run=args.dry_run)
+        return
+
     dottools.run(
-        dottools_root=args.root,
-        config_file_path=args.config_file,
-        field=args.field,
-        command=args.command or "dump",
-        color=args.color,
-        log=args.log,
+        dottools.RunOptions(
+            dottools_root=args.root,
+            config_file_path=args.config_file,
+            field=args.field,
+            command=command,
+            color=args.color,
+            log=args.log,
+            parse_jobs=args.parse_jobs,
+            watch_options=(
+                {
+                    "debounce": args.debounce,
+                    "poll": args.poll,
+                    "poll_interval": args.poll_interval,
+                }
+                if args.command == "watch"
+                else None
+            ),
+            bench_options=(
+                {
+                    "iterations": args.iterations,
+                    "out": args.out,
+                }
+                if args.command == "bench"
+                else None
+            ),
+            compile_options=(
+                {
+                    "hosts_file": args.hosts_file,
+                    "out_dir": args.out_dir,
+                    "host_jobs": args.host_jobs,
+                }
+                if args.command == "compile" and args.hosts_file
+                else None
+            ),
+            export_options={"out": args.out} if args.command == "export" else None,
+            diff_options=(
+                {
+                    "diff_file_limit": args.max_file_lines,
+                    "diff_total_limit": args.max_lines,
+                }
+                if args.command == "diff"
+                else None
+            ),
+            socket_path=args.socket or client.default_socket_path(),
+            plan_out=args.out if args.command == "plan" else None,
+            plan_file=args.plan if args.command == "apply" else None,
+            target_roots=args.target if args.command in {"plan", "apply"} else None,
+            backup=args.command == "apply" and args.backup,
+            output_format=args.format,
+            profile=args.profile,
+            profile_json=args.profile_json,
+            trace_out=args.trace_out,
+            cprofile_out=args.cprofile_out,
+            memory_profile=args.memory_profile,
+        )
     )
 
 
@@ -0,0 +1,108 @@
+import sys
+import json
+import math
+
+from dots import dottools
+from dots.util import fs
+from dots.util.profiler import Profiler, profiler, override_profiler
+
+
+def percentile(values, percent: float) -> float:
+    """
+    Nearest-rank percentile of non-empty values
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _iteration(config_path, field, parse_jobs):
+    # Every iteration pays for its file system lookups
+    fs.reset_stat_cache()
+    _, cfg = dottools.load_config(config_path, parse_jobs)
+
+    for name, plug in dottools.create_plugins(cfg, field):
+        with profiler().phase(f"{name}:build"):
+            plug.build()
+
+        with profiler().phase(f"{name}:difference"):
+            for _ in plug.difference():
+                pass
+
+
+def _summary(iterations):
+    """
+    Given {phase: wall time} of every iteration returns
+    cold (first iteration) and warm (the rest) statistics per phase
+    """
+    phases = list(dict.fromkeys(phase for times in iterations for phase in times))
+    cold, warm = iterations[0], iterations[1:]
+    summary = []
+
+    for phase in phases:
+        warm_times = [times[phase] for times in warm if phase in times]
+        summary.append(
+            {
+                "phase": phase,
+                "cold": cold.get(phase),
+                "warm_p50": percentile(warm_times, 50) if warm_times else None,
+                "warm_p95": percentile(warm_times, 95) if warm_times else None,
+            }
+        )
+
+    return summary
+
+
+def _format_ms(value) -> str:
+    return "-" if value is None else f"{value * 1000:.2f}"
+
+
+def _report_lines(summary, iterations: int):
+    width = max([len("phase")] + [len(record["phase"]) for record in summary])
+    lines = [
+        f"{iterations} iterations, the first one is cold",
+        f"{'phase':<{width}} {'cold ms':>10} {'p50 ms':>10} {'p95 ms':>10}",
+    ]
+
+    for record in summary:
+        lines.append(
+            f"{record['phase']:<{width}} {_format_ms(record['cold']):>10} "
+            f"{_format_ms(record['warm_p50']):>10} {_format_ms(record['warm_p95']):>10}"
+        )
+
+    return lines
+
+
+def bench(config_path, field, parse_jobs=1, iterations=10, out=None) -> None:
+    """
+    Runs loading, plugins' creation, build and difference of
+    the configuration iterations times (in dry-run) and reports
+    per-phase latencies of the first (cold) and the other (warm) runs
+    """
+
+    assert iterations > 0, "At least one iteration is required"
+    outer_profiler = profiler()
+    times = []
+
+    try:
+        for _ in range(iterations):
+            iteration_profiler = Profiler(enabled=True)
+            override_profiler(iteration_profiler)
+            _iteration(config_path, field, parse_jobs)
+
+            times.append(
+                {"total": iteration_profiler.total()}
+                | {
+                    record["phase"]: record["wall"]
+                    for record in iteration_profiler.records()
+                }
+            )
+    finally:
+        override_profiler(outer_profiler)
+
+    summary = _summary(times)
+    sys.stdout.write("\n".join(_report_lines(summary, iterations)) + "\n")
+
+    if out:
+        with open(out, "w", encoding="utf-8") as file:
+            json.dump({"iterations": iterations, "phases": summary}, file, indent=2)
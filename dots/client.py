@@ -0,0 +1,52 @@
+import os
+import sys
+from typing import Optional
+
+# Only lightweight modules are imported at module level:
+# the client must start fast to be worth using
+
+FORWARDED_COMMANDS = {"diff", "plan", "apply", "dump"}
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or os.getenv("TMPDIR") or "/tmp"
+    return os.path.join(runtime_dir, f"dottools-{os.getuid()}.sock")
+
+
+def forward(socket_path: str, request) -> Optional[int]:
+    """
+    Sends the request to a server listening on socket_path and streams
+    its output to stdout/stderr. Returns the exit code of the command
+    or None if there is no server to talk to
+    """
+    import json
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+
+    streams = {
+        "stdout": sys.stdout,
+        "stderr": sys.stderr,
+    }
+
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(request).encode("utf-8") + b"\n")
+        stream.flush()
+
+        for line in stream:
+            message = json.loads(line)
+
+            if "exit" in message:
+                return message["exit"]
+
+            streams[message["stream"]].write(message["data"])
+            streams[message["stream"]].flush()
+
+    # Server has gone away in the middle of the command
+    return 1
@@ -1,5 +1,3 @@
-from pydoc import locate
-
 from dots.config.ignored import IgnoredPathsManager
 from dots.yaml.enrich import LIST_META_KEY
 
@@ -98,6 +96,8 @@ class _TypedObjectTree(_ObjectTreeDictAdapter):
 
     def astype(self, clazz):
         if isinstance(clazz, str):
+            from pydoc import locate
+
             clazz = locate(clazz)
 
         if clazz == list:
@@ -1,17 +1,36 @@
 import os
+from typing import Optional
+
+
+def config_dir(config_path: str) -> str:
+    """
+    Returns the directory !include and !rel paths
+    of the configuration file are relative to
+    """
+    return os.path.dirname(os.path.dirname(config_path))
 
 
 class Context:
-    def __init__(self, config_path: str, dottools_root: str, dry_run: bool) -> None:
+    def __init__(
+        self, config_path: Optional[str], dottools_root: str, dry_run: bool
+    ) -> None:
         self.dry_run = dry_run
+        # None if the command does not read the configuration (`apply --plan`)
         self.cfg_path = config_path
-        self.cfg_dir = os.path.dirname(os.path.dirname(config_path))
+        self.cfg_dir = config_dir(config_path) if config_path else None
         self.home = os.path.expanduser("~")
         self.dottools_root = dottools_root
 
+        # Limits of the difference output in lines (None - unlimited)
+        self.diff_file_limit = None
+        self.diff_total_limit = None
+
     def _join(self, head: str, path: str) -> str:
+        # fs depends on the context, so it is imported here
+        from dots.util.fs import stat_cache
+
         result = os.path.join(head, path)
-        assert os.path.exists(result), f"Path {result} does not exist"
+        assert stat_cache().exists(result), f"Path {result} does not exist"
         return os.path.abspath(result)
 
     def rel(self, path: str) -> str:
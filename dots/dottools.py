@@ -1,31 +1,51 @@
+import collections
 import os
 import re
+import sys
 
 from dots.yaml import loader
 from dots.config import builder
-from dots.plugins import plugin
 
 from dots.context import init_context, Context, context
-from dots.util import tools
+from dots.util import colors, plan, tools
+from dots.util.backup import BackupStore, default_state_dir, override_backup_store
+from dots.util.executor import executor
+from dots.util.profiler import (
+    CProfileProbe,
+    MemoryProbe,
+    Profiler,
+    profiler,
+    override_profiler,
+)
 from dots.util.logger import StdErrLogger, Tags, TAGS_DEPENDENCIES, logger, init_logger
 
 
-def _get_must_be_enabled_tags(command):
+DRY_RUN_COMMANDS = {"config", "diff", "plan", "compile", "bench", "export"}
+
+
+def _get_must_be_enabled_tags(command, output_format="text"):
     must_be_enabled = [
         Tags.OUTPUT,
     ]
 
+    # Differences and actions are written as records to stdout
+    if output_format == "ndjson":
+        return must_be_enabled
+
     if command in {"plan"}:
         must_be_enabled.append(Tags.ACTION)
 
     if command in {"diff"}:
         must_be_enabled.append(Tags.DIFF)
 
+    if command in {"watch", "rollback"}:
+        must_be_enabled.append(Tags.ACTION)
+
     return must_be_enabled
 
 
-def _get_logging_tags(name_list, command):
-    must_be_enabled = _get_must_be_enabled_tags(command)
+def _get_logging_tags(name_list, command, output_format="text"):
+    must_be_enabled = _get_must_be_enabled_tags(command, output_format)
     tag_list = [Tags[name.upper()] for name in name_list]
 
     for tag in must_be_enabled:
@@ -50,6 +70,14 @@ def _get_logging_tags(name_list, command):
             return tag_list
 
 
+def create_logger(log, command, color, output_format="text"):
+    colors.set_enabled(color == "yes")
+    return StdErrLogger(
+        _get_logging_tags(log.split(","), command, output_format),
+        color == "yes",
+    )
+
+
 def _setup_yaml_constructors(base_include_dir, eval_locals):
     def _context_rel_tag_handler(_, node):
         return context().rel(path=node.value)
@@ -62,7 +90,9 @@ def _setup_yaml_constructors(base_include_dir, eval_locals):
     loader.add_yaml_constructor("!plug", _plugin_tag_handler)
 
 
-def _apply_command(plugin_instance, command):
+def _apply_command(name, plugin_instance, command):
+    from dots.plugins import plugin
+
     with logger().indent(label=f"{type(plugin_instance).__name__}.{command}"):
         if command == "compile":
             logger().log(
@@ -70,61 +100,67 @@ def _apply_command(plugin_instance, command):
                 [""] + tools.safe_dump_yaml_lines(plugin_instance.to_dict()),
             )
         elif command == "diff":
-            plugin.Plugin.log_difference(plugin_instance.difference())
+            with profiler().phase(f"{name}:difference"):
+                plugin.Plugin.log_difference(plugin_instance.difference())
         elif command in {"plan", "apply"}:
-            if not plugin.Plugin.any_difference(plugin_instance.difference()):
+            with profiler().phase(f"{name}:difference"):
+                any_difference = plugin.Plugin.any_difference(
+                    plugin_instance.difference()
+                )
+
+            if not any_difference:
                 logger().info("No difference, nothing done")
             else:
-                plugin_instance.apply()
+                # Actions are only submitted here, the executor
+                # times performing them as the apply phase
+                with profiler().phase(f"{name}:queue"):
+                    plugin_instance.apply()
         else:
             assert False, f"Invalid command {command}"
 
 
-def run(
-    dottools_root,
-    config_file_path,
-    field,
-    command,
-    color,
-    log,
-):
-    config_path = os.path.realpath(config_file_path)
+def load_config(config_path, parse_jobs=1):
+    """
+    Loads and enriches the configuration file,
+    returns both raw yaml object and the Config built of it
+    """
+    yml = loader.load_rich_yaml_from(config_path, jobs=parse_jobs)
 
-    init_logger(
-        StdErrLogger(
-            _get_logging_tags(log.split(","), command),
-            color == "yes",
-        )
-    )
+    with profiler().phase("config.create"):
+        return yml, builder.create_config(yml)
 
-    init_context(
-        Context(
-            config_path=config_path,
-            dottools_root=os.path.realpath(dottools_root),
-            dry_run=command in {"config", "diff", "plan", "compile"},
-        ),
-    )
 
-    _setup_yaml_constructors(
-        base_include_dir=context().cfg_dir,
-        eval_locals={
-            "ctx": context(),
-        },
-    )
+def create_plugins(cfg, field=".*"):
+    """
+    Creates all plugins found in cfg and returns
+    (name, plugin) pairs of the ones matching the field regex
+    """
+    # Plugins are imported only by commands that need them,
+    # they pull in heavy modules (e.g. jinja2)
+    from dots.plugins import plugin
 
-    yml = loader.load_rich_yaml_from(config_path)
-    cfg = builder.create_config(yml)
+    from dots.plugins import destinations
 
-    if command == "dump":
-        print(tools.safe_dump_yaml(yml))
-        return
+    with profiler().phase("plugins.create"):
+        plugins_object = plugin.registry().create_all_plugins(cfg)
 
-    matcher = re.compile(field)
-    plugins_object = plugin.registry().create_all_plugins(cfg)
     all_plugins = tools.find_instances_of_subclasses(
         plugins_object, base_class=plugin.Plugin
     )
 
+    # Ownership of destinations is decided among all the plugins,
+    # not only the ones matching the field
+    index = destinations.DestinationIndex()
+    index.add_all(all_plugins)
+    destinations.override_destination_index(index)
+
+    return filter_plugins(all_plugins, field)
+
+
+def filter_plugins(all_plugins, field):
+    matcher = re.compile(field)
+    matching = []
+
     for name, plug in all_plugins:
         if not matcher.search(name):
             logger().info(
@@ -138,6 +174,312 @@ def run(
             )
             continue
 
-        with logger().indent(label=name):
+        matching.append((name, plug))
+
+    return matching
+
+
+def run_plugin(name, plug, command):
+    # Actions pending in a batch are performed before a plugin
+    # reading their targets is built
+    executor().flush_writing(plug.inputs())
+
+    with logger().indent(label=name), executor().owner(name):
+        with profiler().phase(f"{name}:build"):
             plug.build()
-            _apply_command(plug, command)
+
+        _apply_command(name, plug, command)
+
+    logger().flush()
+
+
+def run_plugins(plugins, command):
+    """
+    Runs the command for every (name, plugin) pair, actions of all
+    the plugins are performed together once all of them are done
+    (or once one of them fails, its own actions are dropped then).
+    A plugin whose inputs are written by the plugins run before it
+    is built once their actions are performed
+    """
+    with executor().batch():
+        for name, plug in plugins:
+            run_plugin(name, plug, command)
+
+
+# Options of a single `dots` invocation, built from the command line
+RunOptions = collections.namedtuple(
+    "RunOptions",
+    [
+        "dottools_root",
+        "config_file_path",
+        "field",
+        "command",
+        "color",
+        "log",
+        "parse_jobs",
+        "watch_options",
+        "bench_options",
+        "compile_options",
+        "export_options",
+        "diff_options",
+        "socket_path",
+        "plan_out",
+        "plan_file",
+        "target_roots",
+        "output_format",
+        "backup",
+        "profile",
+        "profile_json",
+        "trace_out",
+        "cprofile_out",
+        "memory_profile",
+    ],
+    defaults=(
+        1,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        "text",
+        False,
+        False,
+        None,
+        None,
+        None,
+        False,
+    ),
+)
+
+
+def _needs_config(options):
+    # A saved plan is performed without reading the configuration
+    return not (options.command == "apply" and options.plan_file)
+
+
+def run(options):
+    config_path = None
+    if _needs_config(options):
+        assert options.config_file_path, "Configuration file is not set (use -c)"
+        config_path = os.path.realpath(options.config_file_path)
+
+    init_logger(
+        create_logger(
+            options.log, options.command, options.color, options.output_format
+        )
+    )
+
+    trace_sink = None
+    if options.trace_out:
+        from dots.util.trace import TraceSink
+
+        trace_sink = TraceSink()
+        logger().set_span_sink(trace_sink)
+
+    init_context(
+        Context(
+            config_path=config_path,
+            dottools_root=os.path.realpath(options.dottools_root),
+            dry_run=options.command in DRY_RUN_COMMANDS,
+        ),
+    )
+
+    for name, value in (options.diff_options or {}).items():
+        assert value is None or value > 0, f"Invalid {name}: {value}"
+        setattr(context(), name, value)
+
+    if config_path is not None:
+        _setup_yaml_constructors(
+            base_include_dir=context().cfg_dir,
+            eval_locals={
+                "ctx": context(),
+            },
+        )
+
+    probes = []
+    if options.cprofile_out:
+        probes.append(CProfileProbe())
+
+    if options.memory_profile:
+        probes.append(MemoryProbe())
+
+    if options.profile or options.profile_json or probes:
+        override_profiler(Profiler(enabled=True, probes=probes))
+
+    store = None
+    if options.backup and options.command == "apply":
+        store = BackupStore(default_state_dir())
+        store.start_run()
+        override_backup_store(store)
+
+    try:
+        _run_command(config_path, options)
+    finally:
+        if store is not None:
+            _finish_backup(store)
+
+        logger().flush()
+
+        if options.profile:
+            profiler().report()
+
+        if options.profile_json:
+            profiler().dump_json(options.profile_json)
+
+        if options.cprofile_out:
+            profiler().probe(CProfileProbe.name).dump(options.cprofile_out)
+
+        if options.memory_profile:
+            sys.stderr.write(
+                "\n".join(profiler().probe(MemoryProbe.name).report_lines()) + "\n"
+            )
+
+        if trace_sink is not None:
+            trace_sink.write(options.trace_out)
+
+
+def _finish_backup(store):
+    override_backup_store(None)
+    run_id = store.finish()
+
+    if run_id is not None:
+        logger().log(
+            Tags.OUTPUT,
+            "Overwritten and removed paths are saved, restore them with "
+            "`dots rollback %s`",
+            run_id,
+        )
+
+
+def rollback(run_id, color, log, dry_run=False):
+    """
+    Restores paths changed by the apply run run_id,
+    lists runs that can be rolled back if run_id is None
+    """
+    init_logger(create_logger(log, "rollback", color))
+    store = BackupStore(default_state_dir())
+
+    if run_id is None:
+        for known_run_id in store.runs():
+            print(known_run_id)
+        return
+
+    store.rollback(run_id, dry_run=dry_run)
+    logger().flush()
+
+
+def _command_watch(config_path, options):
+    from dots import watch
+
+    watch.watch(
+        config_path, options.field, options.parse_jobs, **(options.watch_options or {})
+    )
+
+
+def _command_bench(config_path, options):
+    from dots import bench
+
+    bench.bench(
+        config_path, options.field, options.parse_jobs, **(options.bench_options or {})
+    )
+
+
+def _command_compile_hosts(config_path, options):
+    from dots import hosts
+
+    hosts.compile_hosts(config_path, options.field, **options.compile_options)
+
+
+def _command_export(config_path, options):
+    from dots import export
+
+    export.export(
+        config_path,
+        options.field,
+        parse_jobs=options.parse_jobs,
+        **options.export_options,
+    )
+
+
+def _command_serve(config_path, options):
+    from dots import server
+
+    server.serve(config_path, options.socket_path, options.parse_jobs)
+
+
+def _command_apply_plan(_config_path, options):
+    _apply_plan(options.plan_file)
+
+
+def _command_dump(config_path, options):
+    yml, _ = load_config(config_path, options.parse_jobs)
+    print(tools.safe_dump_yaml(yml))
+
+
+# Commands not running plugins: (command, whether it applies to the options)
+_COMMANDS = {
+    "watch": (_command_watch, lambda _: True),
+    "bench": (_command_bench, lambda _: True),
+    "compile": (_command_compile_hosts, lambda options: options.compile_options),
+    "export": (_command_export, lambda _: True),
+    "serve": (_command_serve, lambda _: True),
+    "apply": (_command_apply_plan, lambda options: options.plan_file),
+    "dump": (_command_dump, lambda _: True),
+}
+
+
+def _run_plugins_command(config_path, options):
+    field, parse_jobs = options.field, options.parse_jobs
+    plan_out = options.command == "plan" and options.plan_out
+
+    if plan_out:
+        plan.start_recording()
+
+    try:
+        if options.target_roots:
+            from dots import targets
+
+            assert options.output_format == "text", "Targets support only text output"
+            targets.apply_to_targets(
+                config_path, field, options.target_roots, parse_jobs
+            )
+        elif options.output_format == "ndjson":
+            from dots import ndjson
+
+            _, cfg = load_config(config_path, parse_jobs)
+            ndjson.run_plugins(create_plugins(cfg, field), options.command)
+        else:
+            _, cfg = load_config(config_path, parse_jobs)
+            run_plugins(create_plugins(cfg, field), options.command)
+    finally:
+        if plan_out:
+            plan.save(options.plan_out, plan.stop_recording())
+
+
+def _run_command(config_path, options):
+    handler, applies = _COMMANDS.get(options.command, (None, None))
+
+    if handler is not None and applies(options):
+        handler(config_path, options)
+        return
+
+    _run_plugins_command(config_path, options)
+
+
+def _apply_plan(plan_file):
+    """
+    Performs actions saved by `plan --out` without building
+    plugins or computing any difference
+    """
+    from dots.util import fs
+
+    actions = plan.load(plan_file)
+    plan.verify(actions)
+
+    with logger().indent(label="plan"), executor().batch():
+        for action in actions:
+            fs.run_action(action)
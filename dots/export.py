@@ -0,0 +1,199 @@
+import io
+import os
+import time
+import hashlib
+
+from dots import dottools
+from dots.context import context
+from dots.util.logger import logger
+
+MANIFEST_NAME = "MANIFEST"
+APPLIER_NAME = "apply.sh"
+OBJECTS_DIR = "objects"
+
+_CHUNK_SIZE = 1024 * 1024
+
+# Applies the bundle on a host with a POSIX shell and coreutils (or busybox):
+#     mkdir bundle && tar -xf bundle.tar -C bundle && cd bundle && sh apply.sh
+# DOTS_HOME (default $HOME) and DOTS_ROOT (default /) choose where files go,
+# -n prints what would be done. Files with the same hash are left untouched
+APPLIER = r"""#!/bin/sh
+set -eu
+
+DRY_RUN=
+if [ "${1:-}" = "-n" ]; then
+    DRY_RUN=1
+fi
+
+HOME_DIR=${DOTS_HOME:-$HOME}
+ROOT_DIR=${DOTS_ROOT:-}
+TAB=$(printf '\t')
+
+target_path() {
+    case "$1" in
+        "~") printf '%s' "$HOME_DIR" ;;
+        "~/"*) printf '%s/%s' "$HOME_DIR" "${1#\~/}" ;;
+        *) printf '%s%s' "$ROOT_DIR" "$1" ;;
+    esac
+}
+
+while IFS="$TAB" read -r kind mode hash path; do
+    case "$kind" in
+        "#"* | "") continue ;;
+    esac
+
+    dst=$(target_path "$path")
+
+    case "$kind" in
+        file)
+            if [ -f "$dst" ] && [ ! -L "$dst" ] &&
+                [ "$(sha256sum <"$dst" | cut -d ' ' -f 1)" = "$hash" ]; then
+                continue
+            fi
+
+            echo "write $dst"
+            [ -n "$DRY_RUN" ] && continue
+
+            mkdir -p "$(dirname "$dst")"
+            cp "objects/$hash" "$dst.dots-new"
+            chmod "$mode" "$dst.dots-new"
+            mv -f "$dst.dots-new" "$dst"
+            ;;
+        *)
+            echo "unknown entry kind $kind" >&2
+            exit 1
+            ;;
+    esac
+done <MANIFEST
+"""
+
+
+def manifest_path(destination: str, home: str) -> str:
+    """
+    Returns destination as written to the manifest: paths
+    under home are relative to it (~/...), the rest are absolute
+    """
+    destination = os.path.abspath(destination)
+
+    if destination == home:
+        return "~"
+
+    if destination.startswith(home.rstrip(os.sep) + os.sep):
+        return "~/" + os.path.relpath(destination, home)
+
+    return destination
+
+
+def _digest(output) -> str:
+    digest = hashlib.sha256()
+
+    if output.kind == "lines":
+        for line in output.lines:
+            digest.update(line.encode("utf-8"))
+
+        return digest.hexdigest()
+
+    # Copied files are hashed in chunks, they may be large
+    with open(output.source, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _mode(output) -> str:
+    """
+    Copied files keep the mode of their source. Applying lines keeps
+    the mode of an existing destination, so it is exported along with
+    them, new files get the usual 644
+    """
+    if output.kind == "lines":
+        if not os.path.isfile(output.destination):
+            return "644"
+
+        return f"{os.stat(output.destination).st_mode & 0o777:o}"
+
+    return f"{os.stat(output.source).st_mode & 0o777:o}"
+
+
+def _tar_info(name: str, size: int, mode: int):
+    import tarfile
+
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = mode
+    info.mtime = int(time.time())
+    return info
+
+
+def _add_bytes(archive, name: str, data: bytes, mode: int) -> None:
+    archive.addfile(_tar_info(name, len(data), mode), io.BytesIO(data))
+
+
+def _add_object(archive, name: str, output) -> None:
+    if output.kind == "lines":
+        _add_bytes(archive, name, "".join(output.lines).encode("utf-8"), 0o644)
+        return
+
+    with open(output.source, "rb") as file:
+        info = _tar_info(name, os.fstat(file.fileno()).st_size, 0o644)
+        archive.addfile(info, file)
+
+
+def _manifest_line(*fields) -> str:
+    for field in fields:
+        assert (
+            "\t" not in field and "\n" not in field
+        ), f"Tabs and newlines are not supported in exported paths: {field!r}"
+
+    return "\t".join(fields) + "\n"
+
+
+def export(config_path, field, out, parse_jobs=1) -> None:
+    """
+    Builds the plugins and writes their outputs to the tar archive out:
+    content-addressed objects, a manifest of destinations with their hashes
+    and modes and a POSIX shell script applying them
+    """
+    import tarfile
+
+    _, cfg = dottools.load_config(config_path, parse_jobs)
+    home = context().home
+    manifest = ["# kind\tmode\tsha256\tpath\n"]
+    stored = set()
+
+    with tarfile.open(out, "w") as archive:
+        for name, plug in dottools.create_plugins(cfg, field):
+            with logger().indent(label=name):
+                plug.build()
+
+                for output in plug.outputs():
+                    path = manifest_path(output.destination, home)
+
+                    # Links would point to paths of this host
+                    assert (
+                        output.kind != "link"
+                    ), f"Symbolic links cannot be exported: {output.destination}"
+
+                    digest = _digest(output)
+
+                    if digest not in stored:
+                        _add_object(archive, f"{OBJECTS_DIR}/{digest}", output)
+                        stored.add(digest)
+
+                    manifest.append(_manifest_line("file", _mode(output), digest, path))
+
+        _add_bytes(archive, MANIFEST_NAME, "".join(manifest).encode("utf-8"), 0o644)
+        _add_bytes(archive, APPLIER_NAME, APPLIER.encode("utf-8"), 0o755)
+
+    logger().info(
+        [
+            "Bundle exported",
+            "path\t= %s",
+            "entries\t= %s",
+            "objects\t= %s",
+        ],
+        out,
+        len(manifest) - 1,
+        len(stored),
+    )
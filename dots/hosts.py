@@ -0,0 +1,222 @@
+import os
+import shutil
+import contextlib
+import collections
+
+from dots import dottools
+from dots.context import config_dir, context
+from dots.yaml import loader
+from dots.util.logger import logger
+from dots.util.profiler import profiler
+
+# Values of these tags may differ from host to host,
+# files using them are never shared between hosts
+HOST_DEPENDENT_TAGS = {"!env", "!eval", "!rel"}
+
+_CTX_PREFIX = "ctx."
+
+Host = collections.namedtuple("Host", ["name", "config_path", "env", "ctx"])
+
+
+def parse_hosts_file(path: str, default_config_path: str):
+    """
+    Parses a file with a host per line:
+
+        name [config-path] [VAR=value ...] [ctx.attribute=value ...]
+
+    config-path (relative to the hosts file) defaults to the main
+    configuration file, its !include and !rel paths are resolved
+    the same way as the main one's but against its own location
+    (see context.config_dir()), VAR=value sets an environment variable and
+    ctx.attribute=value overrides an attribute of the context (ctx)
+    for the host only. Empty lines and lines starting with # are skipped
+    """
+    hosts = []
+
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            words = line.split()
+
+            if not words or words[0].startswith("#"):
+                continue
+
+            name, rest = words[0], words[1:]
+            config_path = default_config_path
+
+            if rest and "=" not in rest[0]:
+                config_path = os.path.join(os.path.dirname(path), rest.pop(0))
+
+            env, ctx = {}, {}
+
+            for word in rest:
+                assert "=" in word, f"{path}:{number}: expected KEY=value, got {word}"
+                key, value = word.split("=", 1)
+
+                if key.startswith(_CTX_PREFIX):
+                    ctx[key.removeprefix(_CTX_PREFIX)] = value
+                else:
+                    env[key] = value
+
+            hosts.append(Host(name, os.path.realpath(config_path), env, ctx))
+
+    names = [host.name for host in hosts]
+    assert len(names) == len(set(names)), f"Duplicate host names in {path}"
+    return hosts
+
+
+@contextlib.contextmanager
+def _host_overrides(host: Host):
+    saved_env = {name: os.environ.get(name) for name in host.env}
+    saved_ctx = {
+        name: getattr(context(), name)
+        for name in ["cfg_path", "cfg_dir"] + list(host.ctx)
+    }
+
+    os.environ.update(host.env)
+    context().cfg_path = host.config_path
+    context().cfg_dir = config_dir(host.config_path)
+
+    for name, value in host.ctx.items():
+        setattr(context(), name, value)
+
+    loader.set_include_base_dir(context().cfg_dir)
+
+    try:
+        yield
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+        for name, value in saved_ctx.items():
+            setattr(context(), name, value)
+
+        loader.set_include_base_dir(context().cfg_dir)
+
+
+def _host_dependent_files(hosts):
+    """
+    Returns yaml files (reachable from the hosts' roots) using
+    host dependent tags or including other files relative to
+    different directories, the rest of them is parsed only once
+    """
+    graph = {}
+    base_dirs = {}
+
+    for host in hosts:
+        base_dir = config_dir(host.config_path)
+
+        for path, includes in loader.include_graph(host.config_path, base_dir).items():
+            graph.setdefault(path, set()).update(includes)
+
+            if includes:
+                base_dirs.setdefault(path, set()).add(base_dir)
+
+    return {
+        path
+        for path in graph
+        if os.path.isfile(path) and loader.tags_used(path, HOST_DEPENDENT_TAGS)
+    } | {path for path, dirs in base_dirs.items() if len(dirs) > 1}
+
+
+def _write_output(output, root: str) -> None:
+    path = os.path.join(root, os.path.abspath(output.destination).lstrip(os.sep))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if output.kind == "lines":
+        with open(path, "w", encoding="utf-8") as file:
+            file.writelines(output.lines)
+    elif output.kind == "copy":
+        shutil.copyfile(output.source, path)
+    elif output.kind == "link":
+        if os.path.lexists(path):
+            os.remove(path)
+
+        os.symlink(output.source, path)
+    else:
+        assert False, f"Unknown output kind {output.kind}"
+
+
+def _compile_host(host: Host, field: str, out_dir: str, dependent) -> int:
+    with logger().indent(label=host.name), profiler().phase(f"host:{host.name}"):
+        with _host_overrides(host):
+            try:
+                _, cfg = dottools.load_config(host.config_path)
+            finally:
+                loader.invalidate_included_files(dependent)
+
+            root = os.path.join(out_dir, host.name)
+            written = 0
+
+            for _, plug in dottools.create_plugins(cfg, field):
+                plug.build()
+
+                for output in plug.outputs():
+                    _write_output(output, root)
+                    written += 1
+
+    logger().info(
+        [
+            "Host compiled",
+            "host\t= %s",
+            "outputs\t= %s",
+        ],
+        host.name,
+        written,
+    )
+    # Messages of a worker process are lost unless written before it exits
+    logger().flush()
+    return written
+
+
+def _compile_in_pool(hosts, field, out_dir, dependent, jobs: int) -> None:
+    import multiprocessing
+    from concurrent import futures
+
+    # Forked workers inherit the already parsed shared files, buffered
+    # messages must not be inherited too, they would be written twice
+    logger().flush()
+    pool = futures.ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+    )
+
+    with pool:
+        submitted = [
+            pool.submit(_compile_host, host, field, out_dir, dependent)
+            for host in hosts
+        ]
+
+        for future in submitted:
+            future.result()
+
+
+def compile_hosts(
+    config_path, field, hosts_file, out_dir, host_jobs=1
+):  # pylint: disable=too-many-arguments
+    """
+    Renders outputs of the plugins of every host of hosts_file into
+    out_dir/<host>/<destination>. Included files not using
+    host dependent tags are parsed once for all the hosts
+    """
+
+    hosts = parse_hosts_file(hosts_file, config_path)
+
+    if not hosts:
+        return
+
+    dependent = _host_dependent_files(hosts)
+    loader.retain_included_files(True)
+
+    try:
+        # The first host warms up the shared files for the rest
+        _compile_host(hosts[0], field, out_dir, dependent)
+
+        if host_jobs > 1 and len(hosts) > 2:
+            _compile_in_pool(hosts[1:], field, out_dir, dependent, host_jobs)
+        else:
+            for host in hosts[1:]:
+                _compile_host(host, field, out_dir, dependent)
+    finally:
+        loader.retain_included_files(False)
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+
+from dots.util import actions, colors, plan
+from dots.util.executor import executor
+from dots.util.profiler import profiler
+
+
+class RecordWriter:
+    """
+    Writes records as JSON lines to a buffered stream,
+    flushing it once per plugin
+    """
+
+    def __init__(self, stream=None) -> None:
+        self._stream = stream if stream is not None else sys.stdout
+
+    def write(self, record) -> None:
+        self._stream.write(json.dumps(record, separators=(",", ":")))
+        self._stream.write("\n")
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def _size(path: str):
+    try:
+        return os.path.getsize(path) if os.path.isfile(path) else None
+    except OSError:
+        return None
+
+
+def _split_by_file(difference):
+    """
+    Consumes the difference of a plugin and returns whether it is not
+    empty and {path: text} of differences of single files found in it
+    """
+    from dots.plugins import plugin
+
+    found = False
+    files = {}
+    current = None
+
+    for chunk in difference:
+        found = found or bool(chunk)
+
+        for line in chunk.splitlines(keepends=True):
+            if line.startswith(plugin.FILE_DIFFERENCE_PREFIX):
+                current = line.removeprefix(plugin.FILE_DIFFERENCE_PREFIX)
+                current = current.rstrip("\n")
+                files[current] = []
+            elif line.startswith(plugin.FILE_REMOVAL_PREFIX):
+                current = None
+            elif current is not None:
+                files[current].append(line)
+
+    return found, {path: "".join(lines) for path, lines in files.items()}
+
+
+def _plain_difference(plug):
+    """
+    Returns _split_by_file() of the plugin's difference computed without colors
+    """
+    enabled = colors.enabled()
+    colors.set_enabled(False)
+
+    try:
+        return _split_by_file(plug.difference())
+    finally:
+        colors.set_enabled(enabled)
+
+
+def change_record(plugin_name: str, action: actions.Action, differences=None):
+    """
+    Describes the action of the plugin as a record: what it does to
+    which path, hashes and sizes of the path before and after it.
+    If differences ({path: text} of the plugin) are given, writes
+    and copies get the text computed by the plugin for their path
+    """
+    record = {
+        "type": "change",
+        "plugin": plugin_name,
+        "kind": action.kind,
+        "path": action.target,
+        "old_hash": actions.hash_path(action.target),
+        "old_size": _size(action.target),
+        "new_hash": None,
+        "new_size": None,
+    }
+
+    if isinstance(action, actions.WriteFile):
+        content = "".join(action.lines)
+        record["new_hash"] = actions.hash_content(content)
+        record["new_size"] = len(content.encode("utf-8"))
+    elif isinstance(action, actions.CopyFile):
+        record["source"] = action.src
+        record["new_hash"] = actions.hash_path(action.src)
+        record["new_size"] = _size(action.src)
+    elif isinstance(action, actions.Link):
+        record["source"] = action.src
+        record["new_hash"] = f"link:{action.src}"
+
+    if differences is not None and isinstance(
+        action, (actions.WriteFile, actions.CopyFile)
+    ):
+        record["diff"] = differences.get(action.target)
+
+    return record
+
+
+def run_plugins(plugins, command, writer=None) -> None:
+    """
+    Runs diff, plan or apply for (name, plugin) pairs writing a record per
+    change followed by a record per plugin instead of logging them
+    """
+    from dots.plugins import plugin
+
+    writer = writer or RecordWriter()
+
+    for name, plug in plugins:
+        with profiler().phase(f"{name}:build"):
+            plug.build()
+
+        with profiler().phase(f"{name}:difference"):
+            if command == "diff":
+                # The text of the difference is kept for the change records
+                any_difference, differences = _plain_difference(plug)
+            else:
+                differences = None
+                any_difference = plugin.Plugin.any_difference(plug.difference())
+
+        changes = []
+
+        if any_difference:
+            with executor().collect() as changes:
+                plug.apply()
+
+        changes = [
+            action for action in changes if not isinstance(action, actions.MakeDir)
+        ]
+
+        for action in changes:
+            writer.write(change_record(name, action, differences))
+
+            # Collected actions do not reach the executor, so
+            # `plan --out` has to be given them explicitly
+            if command == "plan":
+                plan.record(action)
+
+        if command == "apply" and changes:
+            with profiler().phase(f"{name}:apply"), executor().batch():
+                for action in changes:
+                    executor().submit(action)
+
+        writer.write(
+            {
+                "type": "plugin",
+                "plugin": name,
+                "plugin_type": type(plug).__name__,
+                "changes": len(changes),
+                "command": command,
+            }
+        )
+        writer.flush()
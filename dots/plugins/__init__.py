@@ -1,6 +0,0 @@
-import dots.plugins.plugin
-
-import dots.plugins.dir
-import dots.plugins.file
-import dots.plugins.generate
-import dots.plugins.shellrc
@@ -0,0 +1,109 @@
+import os
+
+from dots.util.logger import logger
+
+
+def _normalize(path: str) -> str:
+    return os.path.abspath(os.path.expanduser(path))
+
+
+class DestinationIndex:
+    """
+    Maps destination paths to plugins writing them. A path belongs
+    to the plugin with the deepest destination containing it, so a File
+    inside a directory of a Dir takes the file over from the Dir.
+    Of plugins with the same destination the last one in config order
+    writes it
+    """
+
+    def __init__(self) -> None:
+        self._owners = {}
+
+    def add_all(self, plugins) -> None:
+        """
+        Adds destinations of all (name, plugin) pairs,
+        reports same and nested destinations
+        """
+        names = {}
+
+        for name, plug in plugins:
+            names[id(plug)] = name
+
+            for destination in plug.destinations():
+                destination = _normalize(destination)
+                other = self._owners.get(destination)
+
+                if other is not None and other is not plug:
+                    logger().warning(
+                        [
+                            "Plugins have the same destination, "
+                            "it is left to the latter",
+                            "path\t= %s",
+                            "former\t= %s",
+                            "latter\t= %s",
+                        ],
+                        destination,
+                        names[id(other)],
+                        name,
+                    )
+
+                self._owners[destination] = plug
+
+        for destination, plug in self._owners.items():
+            parent = self._parent_owner(destination)
+
+            if parent is None or parent[1] is plug:
+                continue
+
+            logger().warning(
+                [
+                    "Destinations of plugins overlap, the nested one is "
+                    "left to the inner plugin",
+                    "outer\t= %s (%s)",
+                    "inner\t= %s (%s)",
+                ],
+                names[id(parent[1])],
+                parent[0],
+                names[id(plug)],
+                destination,
+            )
+
+    def _parent_owner(self, path: str):
+        parent = os.path.dirname(path)
+
+        while parent != path:
+            if parent in self._owners:
+                return parent, self._owners[parent]
+
+            path, parent = parent, os.path.dirname(parent)
+
+        return None
+
+    def owner(self, path: str):
+        """
+        Returns the plugin the path belongs to (None if there is no such one)
+        """
+        path = _normalize(path)
+
+        if path in self._owners:
+            return self._owners[path]
+
+        parent = self._parent_owner(path)
+        return parent[1] if parent is not None else None
+
+    def is_owned_by_other(self, path: str, plug) -> bool:
+        owner = self.owner(path)
+        return owner is not None and owner is not plug
+
+
+_global_destination_index = DestinationIndex()
+
+
+def override_destination_index(index: DestinationIndex) -> None:
+    global _global_destination_index  # pylint: disable=global-statement
+    _global_destination_index = index
+
+
+def destination_index() -> DestinationIndex:
+    global _global_destination_index  # pylint: disable=global-variable-not-assigned
+    return _global_destination_index
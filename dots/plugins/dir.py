@@ -1,8 +1,10 @@
 import os
 
-from dots.util import fs
+from dots.context import context
+from dots.util import delta, fs
 from dots.util.logger import logger
 from dots.plugins import plugin
+from dots.plugins.destinations import destination_index
 
 
 class Dir(plugin.Plugin):
@@ -13,6 +15,10 @@ class Dir(plugin.Plugin):
         self._destination = os.path.expanduser(self.config.get("dst").astype(str))
         self._source = os.path.expanduser(self.config.get("src").astype(str))
         self._softlink = self.config.get("softlink", False).astype(bool)
+        self._delta_options = delta.options_from_config(self.config)
+        self._diff_max_size = self.config.getp(
+            "diff-max-size", fs.TEXT_DIFF_MAX_SIZE
+        ).astype(int)
         self._diff_abspaths = []
         self._paths_to_remove = []
 
@@ -23,9 +29,15 @@ class Dir(plugin.Plugin):
         return self._raw_diff()
 
     def _softlink_diff(self):
-        if not os.path.islink(self._destination):
+        if destination_index().is_owned_by_other(self._destination, self):
+            logger().info(
+                f"Destination {self._destination} is written by another plugin"
+            )
+            return []
+
+        if not fs.stat_cache().islink(self._destination):
             logger().info(f"Destination {self._destination} is not a link")
-            return [f"link {self._destination} -> {self._source}"]
+            return [f"link {self._destination} -> {self._source}\n"]
 
         if os.path.realpath(os.readlink(self._destination)) != os.path.realpath(
             self._source
@@ -33,50 +45,84 @@ class Dir(plugin.Plugin):
             logger().info(
                 f"Destination {self._destination} does not point to {self._source}"
             )
-            return [f"link {self._destination} -> {self._source}"]
+            return [f"link {self._destination} -> {self._source}\n"]
 
         return []
 
-    def _raw_diff(self):
-        _difference = []
-        _paths_to_remove = []
+    def inputs(self):
+        return [self._source]
+
+    def destinations(self):
+        return [self._destination]
 
-        def diff_file(source_path, destination_path):
-            diff = fs.files_difference(source_path, destination_path)
+    def outputs(self):
+        index = destination_index()
 
-            if diff:
-                _difference.append(
-                    f"diff for file: {destination_path}\n{''.join(diff)}"
-                )
-                self._diff_abspaths.append((source_path, destination_path))
+        if self._softlink:
+            if index.is_owned_by_other(self._destination, self):
+                return []
+
+            return [plugin.Output("link", self._destination, self._source)]
+
+        outputs = []
+
+        def output_file(source_path, destination_path):
+            if not index.is_owned_by_other(destination_path, self):
+                outputs.append(plugin.Output("copy", destination_path, source_path))
 
         fs.recurse_directories(
-            self._source, self._destination, diff_file, self._ignore_regex
+            self._source, self._destination, output_file, self._ignore_regex
         )
+        return outputs
 
-        def to_remove(destination_path, source_path):
-            if not os.path.exists(source_path):
-                _paths_to_remove.append(f"remove file {destination_path}")
-                self._paths_to_remove.append(destination_path)
-
-        if os.path.exists(self._destination):
-            fs.recurse_directories(
-                self._destination,
-                self._source,
-                to_remove,
-                self._ignore_regex,
+    def _raw_diff(self):
+        self._diff_abspaths = []
+        self._paths_to_remove = []
+        index = destination_index()
+        header = f"Directories {self._destination} and {self._source} differ:\n"
+
+        for source_path, destination_path in fs.walk_directories(
+            self._source, self._destination, self._ignore_regex
+        ):
+            if index.is_owned_by_other(destination_path, self):
+                continue
+
+            diff = fs.files_difference(
+                source_path,
+                destination_path,
+                self._diff_max_size,
+                context().diff_file_limit,
             )
 
-        _difference += _paths_to_remove
+            if not diff:
+                continue
 
-        if not _difference:
-            return []
+            if header is not None:
+                yield header
+                header = None
 
-        return (
-            [f"Directories {self._destination} and {self._source} differ:"]
-            + _difference
-            + _paths_to_remove
-        )
+            self._diff_abspaths.append((source_path, destination_path))
+            yield plugin.file_difference_header(destination_path)
+            yield from diff
+
+        if not fs.stat_cache().exists(self._destination):
+            return
+
+        for destination_path, source_path in fs.walk_directories(
+            self._destination, self._source, self._ignore_regex
+        ):
+            if index.is_owned_by_other(destination_path, self):
+                continue
+
+            if fs.stat_cache().exists(source_path):
+                continue
+
+            if header is not None:
+                yield header
+                header = None
+
+            self._paths_to_remove.append(destination_path)
+            yield plugin.file_removal_line(destination_path)
 
     def apply(self):
         if self._softlink:
@@ -87,7 +133,7 @@ class Dir(plugin.Plugin):
     def _raw_apply(self):
         with logger().indent("perform_apply"):
             for source, destination in self._diff_abspaths:
-                fs.copy_file(source, destination)
+                fs.copy_file(source, destination, self._delta_options)
 
             for destination in self._paths_to_remove:
                 fs.try_remove(destination)
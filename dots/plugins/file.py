@@ -1,8 +1,10 @@
 import os
 
-from dots.util import diff, fs
+from dots.context import context
+from dots.util import delta, diff, fs
 from dots.util.logger import logger
 from dots.plugins import plugin
+from dots.plugins.destinations import destination_index
 
 
 class File(plugin.Plugin):
@@ -12,6 +14,8 @@ class File(plugin.Plugin):
         self._current_lines = None
         self._lines = None
         self._plugin = None
+        self._inputs = []
+        self._delta_options = delta.options_from_config(self.config)
 
         source = self.config.get("src")
 
@@ -20,7 +24,10 @@ class File(plugin.Plugin):
 
         elif source.istype(str):
             source_path = source.astype(str)
-            assert os.path.isfile(source_path), f"Path {source_path} is not a file"
+            assert fs.stat_cache().isfile(
+                source_path
+            ), f"Path {source_path} is not a file"
+            self._inputs = [source_path]
             self._lines_source = lambda: fs.read_lines_or_empty(source_path)
 
         elif source.istype(dict):
@@ -36,23 +43,43 @@ class File(plugin.Plugin):
 
         return self._plugin._to_dict_extra()
 
+    def inputs(self):
+        if self._plugin:
+            return self._plugin.inputs()
+
+        return self._inputs
+
+    def destinations(self):
+        return [self._destination]
+
+    def outputs(self):
+        if destination_index().is_owned_by_other(self._destination, self):
+            return []
+
+        return [plugin.Output("lines", self._destination, lines=self._lines)]
+
     def build(self):
         self._current_lines = fs.read_lines_or_empty(self._destination)
         self._lines = self._lines_source()
 
     def difference(self):
-        d = diff.get_diff_lines(self._current_lines, self._lines)
+        if destination_index().is_owned_by_other(self._destination, self):
+            logger().info(
+                f"Destination {self._destination} is written by another plugin"
+            )
+            return
 
-        if not d:
-            return []
+        d = diff.get_diff_lines(
+            self._current_lines, self._lines, limit=context().diff_file_limit
+        )
 
-        return [
-            f"diff for file {self._destination}:\n{''.join(d)}",
-        ]
+        if d:
+            yield plugin.file_difference_header(self._destination)
+            yield from d
 
     def apply(self):
         with logger().indent("perform_apply"):
-            return fs.write_lines(self._lines, self._destination)
+            return fs.write_lines(self._lines, self._destination, self._delta_options)
 
 
 plugin.registry().register(File)
@@ -1,6 +1,5 @@
 import os
 import json
-import jinja2
 
 from dots import context
 from dots.util import fs
@@ -8,20 +7,32 @@ from dots.config.config import Config
 from dots.plugins import plugin
 
 
-def _get_loader(template_dirs):
-    return jinja2.ChoiceLoader(
-        [
-            jinja2.FileSystemLoader(searchpath=template_dir)
-            for template_dir in template_dirs
-        ]
-    )
-
-
 def _to_pretty_json(value):
     return json.dumps(value, sort_keys=True, indent=2, separators=(",", ": "))
 
 
-jinja2.filters.FILTERS["to_pretty_json"] = _to_pretty_json
+# Environments and compiled templates are shared by plugin instances,
+# so that plugins created again (another host, a reloaded configuration)
+# do not compile the same templates again
+_environments = {}
+_compiled_templates = {}
+
+
+def _create_environment(template_dirs):
+    # jinja2 is heavy, it is imported only when a template is actually used
+    import jinja2
+
+    environment = jinja2.Environment(
+        loader=jinja2.ChoiceLoader(
+            [
+                jinja2.FileSystemLoader(searchpath=template_dir)
+                for template_dir in template_dirs
+            ]
+        ),
+        extensions=["jinja2.ext.do"],
+    )
+    environment.filters["to_pretty_json"] = _to_pretty_json
+    return environment
 
 
 class Generate(plugin.Plugin):
@@ -31,15 +42,47 @@ class Generate(plugin.Plugin):
         template_dirs = self.config.get(
             "templates_dir", default=[os.path.dirname(self._template)]
         ).astype(list)
-        self._environment = jinja2.Environment(
-            loader=_get_loader(template_dirs), extensions=["jinja2.ext.do"]
-        )
-        assert os.path.isfile(self._template), f"Path {self._template} is not a file"
+        self._template_dirs = [
+            os.path.expanduser(
+                template_dir
+                if isinstance(template_dir, str)
+                else template_dir.astype(str)
+            )
+            for template_dir in template_dirs
+        ]
+        dirs_key = tuple(self._template_dirs)
+
+        if dirs_key not in _environments:
+            _environments[dirs_key] = _create_environment(self._template_dirs)
+
+        self._environment = _environments[dirs_key]
+        assert fs.stat_cache().isfile(
+            self._template
+        ), f"Path {self._template} is not a file"
+
+    def _get_template(self):
+        # Compiled template is reused while the file is unchanged
+        stat = fs.stat_cache().stat(self._template)
+        key = (stat.st_mtime_ns, stat.st_size)
+        template_key = (self._template, tuple(self._template_dirs))
+        compiled = _compiled_templates.get(template_key)
+
+        if compiled is None or compiled[0] != key:
+            compiled = (
+                key,
+                self._environment.from_string(
+                    "".join(fs.read_lines_or_empty(self._template))
+                ),
+            )
+            _compiled_templates[template_key] = compiled
+
+        return compiled[1]
+
+    def inputs(self):
+        return [self._template] + self._template_dirs
 
     def build(self):
-        template = self._environment.from_string(
-            "".join(fs.read_lines_or_empty(self._template))
-        )
+        template = self._get_template()
 
         def map_line(line):
             if not line or len(line) == 0:
@@ -1,10 +1,53 @@
 import abc
+import itertools
+import collections
 
 from dots.config.config import Config
-from dots.util import tools
+from dots.context import context
+from dots.util import diff, tools
 from dots.util.logger import logger, Tags
 
 
+def _limit_lines(chunks, limit):
+    if limit is None:
+        yield from chunks
+        return
+
+    lines = 0
+
+    for chunk in chunks:
+        lines += chunk.count("\n")
+        yield chunk
+
+        # Stops before the next chunk is computed
+        if lines >= limit:
+            yield diff.TRUNCATED_NOTE
+            return
+
+
+FILE_DIFFERENCE_PREFIX = "diff for file: "
+FILE_REMOVAL_PREFIX = "remove file "
+
+
+def file_difference_header(path: str) -> str:
+    """
+    Starts the difference of a single file in the output of difference()
+    """
+    return f"{FILE_DIFFERENCE_PREFIX}{path}\n"
+
+
+def file_removal_line(path: str) -> str:
+    return f"{FILE_REMOVAL_PREFIX}{path}\n"
+
+
+# A file system entry produced by a plugin: kind is one of "lines"
+# (lines written to destination), "copy" (file source copied to
+# destination) or "link" (destination is a symbolic link to source)
+Output = collections.namedtuple(
+    "Output", ["kind", "destination", "source", "lines"], defaults=[None, None]
+)
+
+
 class Plugin(abc.ABC):
     def __init__(self, config: Config) -> None:
         self.config = config
@@ -37,8 +80,10 @@ class Plugin(abc.ABC):
 
     def difference(self):
         """
-        Should return a list of strings representing difference
-        of the self.config and the current state, i.e.
+        Should return an iterable of chunks of text (each ending with
+        a newline) representing difference of the self.config and the
+        current state. It may be a generator: apply() is called only
+        after the difference has been iterated over completely
         """
         return []
 
@@ -47,41 +92,94 @@ class Plugin(abc.ABC):
         Applies configuration stored in self.config
         """
 
+    def inputs(self):
+        """
+        Should return a list of paths of files and directories
+        this plugin reads, i.e. the ones that affect its result
+        """
+        return []
+
+    def destinations(self):
+        """
+        Should return a list of paths of files and directories
+        this plugin writes to
+        """
+        return []
+
+    def outputs(self):
+        """
+        Should return a list of Output this plugin produces once built,
+        independently of the current state of its destinations
+        """
+        return []
+
     @staticmethod
     def log_difference(difference) -> None:
-        if not difference:
-            logger().info("No difference")
-            return
+        """
+        Streams chunks of difference to the log as they are computed,
+        stops computing once context().diff_total_limit lines are logged
+        """
+        chunks = iter(difference)
+        first = next(chunks, None)
 
-        if isinstance(difference, list):
-            logger().log(
-                Tags.DIFF,
-                "\n".join(difference).replace("%", "%%"),
-            )
+        if first is None:
+            logger().info("No difference")
             return
 
-        logger().log(Tags.DIFF, str(difference))
+        logger().stream(
+            Tags.DIFF,
+            _limit_lines(itertools.chain([first], chunks), context().diff_total_limit),
+        )
 
     @staticmethod
     def any_difference(difference) -> bool:
-        if not difference:
-            return False
+        """
+        Iterates over the whole difference (so that the plugin
+        is ready to apply it) and returns whether it is not empty
+        """
+        found = False
+
+        for _ in difference:
+            found = True
+
+        return found
+
+
+ENTRY_POINTS_GROUP = "dots.plugins"
+
+# Built-in plugins, imported only when met in the configuration
+_BUILTIN_PLUGINS = {
+    "Dir": "dots.plugins.dir",
+    "File": "dots.plugins.file",
+    "Generate": "dots.plugins.generate",
+    "Shellrc": "dots.plugins.shellrc",
+}
 
-        if isinstance(difference, list):
-            return True
 
-        return False
+def _entry_points_index():
+    """
+    Returns {name: entry point} of plugins provided by
+    installed distributions in the dots.plugins group
+    """
+    from importlib import metadata
+
+    return {
+        entry_point.name: entry_point
+        for entry_point in metadata.entry_points(group=ENTRY_POINTS_GROUP)
+    }
 
 
 class _PluginRegistry:
-    def __init__(self) -> None:
+    def __init__(self, index=None) -> None:
         self._name_to_clazz = {}
+        self._index = dict(_BUILTIN_PLUGINS if index is None else index)
+        self._entry_points = None
 
     def register(self, clazz) -> None:
         name: str = clazz.__name__
 
         assert (
-            name not in self._name_to_clazz
+            f"plug.{name}" not in self._name_to_clazz
         ), f"Plugin with name {name} is already registered as {clazz}"
 
         assert name[
@@ -90,6 +188,53 @@ class _PluginRegistry:
 
         self._name_to_clazz[f"plug.{name}"] = clazz
 
+    def _load_from_index(self, name: str) -> None:
+        import importlib
+
+        module = importlib.import_module(self._index[name])
+
+        # The module has registered its plugins in the global registry
+        # on import, this one may still need them
+        if f"plug.{name}" not in self._name_to_clazz and hasattr(module, name):
+            self.register(getattr(module, name))
+
+    def _load_from_entry_point(self, name: str) -> None:
+        if self._entry_points is None:
+            self._entry_points = _entry_points_index()
+
+        if name not in self._entry_points:
+            return
+
+        loaded = self._entry_points[name].load()
+
+        if f"plug.{name}" in self._name_to_clazz:
+            return
+
+        if isinstance(loaded, type):
+            self.register(loaded)
+        elif hasattr(loaded, name):
+            self.register(getattr(loaded, name))
+
+    def _resolve(self, plugin_name: str) -> None:
+        """
+        Imports the module providing plugin_name (plug.Name)
+        if it has not been registered yet
+        """
+
+        if plugin_name in self._name_to_clazz:
+            return
+
+        name = plugin_name.removeprefix("plug.")
+
+        if name in self._index:
+            self._load_from_index(name)
+        else:
+            self._load_from_entry_point(name)
+
+        assert (
+            plugin_name in self._name_to_clazz
+        ), f"Plugin with name {plugin_name} not found"
+
     def _get_plugin_spec(self, config: Config, key: str):
         assert config.istype(dict), "TBD"
         as_dict = config.astype(dict)
@@ -110,7 +255,7 @@ class _PluginRegistry:
             plugin_name = plugin_config.get("type").astype(str)
             plugin_config = plugin_config.get("config", {})
 
-        assert plugin_name in self._name_to_clazz, "TBD"
+        self._resolve(plugin_name)
         return plugin_name, plugin_config
 
     def create_plugin(self, config: Config, key: str = None) -> Plugin:
@@ -1,7 +1,5 @@
-import os
-
 from dots.config.config import Config
-from dots.util import env
+from dots.util import env, fs
 from dots.context import context
 from dots.plugins import plugin, file
 
@@ -10,13 +8,24 @@ def _write_scripts(config: Config, kind: str, out) -> None:
     for script in config.get(kind, []).astype(list):
         str_script = script.astype(str)
 
-        if os.path.isfile(str_script):
+        if fs.stat_cache().isfile(str_script):
             with open(str_script, "r", encoding="utf-8") as script_f:
                 out.extend(script_f.readlines())
         else:
             out.append(f"{str_script}\n")
 
 
+def _script_files(config: Config):
+    scripts = []
+
+    for kind in ("pre", "mid", "post"):
+        for script in config.get(kind, []).astype(list):
+            if fs.stat_cache().isfile(script.astype(str)):
+                scripts.append(script.astype(str))
+
+    return scripts
+
+
 def _write_base_env(config: Config, out) -> None:
     base_env = {
         env.CONFIG_FILE_PATH_ENV_VAR: context().cfg_path,
@@ -71,5 +80,8 @@ class Shellrc(file.File):
             config=config, custom_line_source=lambda: _create_shellrc(self.config)
         )
 
+    def inputs(self):
+        return _script_files(self.config)
+
 
 plugin.registry().register(Shellrc)
@@ -0,0 +1,205 @@
+import io
+import os
+import sys
+import json
+import signal
+import socket
+import contextlib
+import traceback
+import socketserver
+
+from dots import dottools
+from dots.client import FORWARDED_COMMANDS
+from dots.context import context
+from dots.yaml import loader
+from dots.util import fs, tools
+from dots.util.logger import logger, override_logger
+
+
+def _stat_key(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _StreamWriter(io.TextIOBase):
+    """
+    Text stream forwarding everything written to it to the client
+    """
+
+    def __init__(self, wfile, name: str) -> None:
+        super().__init__()
+        self._wfile = wfile
+        self._name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        message = {"stream": self._name, "data": data}
+        self._wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        return len(data)
+
+    def flush(self) -> None:
+        self._wfile.flush()
+
+
+class _WarmState:
+    """
+    Keeps the loaded configuration and created plugins between requests
+    and reloads them when the fingerprint of their inputs changes
+    """
+
+    def __init__(self, config_path: str, parse_jobs: int) -> None:
+        self._config_path = config_path
+        self._parse_jobs = parse_jobs
+        self._fingerprint = None
+        self.yml = None
+        self.plugins = None
+
+    def _compute_fingerprint(self):
+        paths = {self._config_path} | loader.included_files()
+        files = {path: _stat_key(path) for path in paths}
+        env = {name: os.environ.get(name) for name in loader.env_vars_read()}
+        return files, env
+
+    def _invalidate(self) -> None:
+        old_files, old_env = self._fingerprint
+        new_files, new_env = self._compute_fingerprint()
+
+        if old_env != new_env:
+            loader.invalidate_included_files(new_files.keys())
+            return
+
+        loader.invalidate_included_files(
+            path for path in new_files if new_files[path] != old_files.get(path)
+        )
+
+    def ensure_loaded(self) -> None:
+        if self._fingerprint is not None:
+            if self._fingerprint == self._compute_fingerprint():
+                return
+
+            self._invalidate()
+
+        logger().info(
+            [
+                "Loading configuration",
+                "path\t= %s",
+            ],
+            self._config_path,
+        )
+
+        self.yml, cfg = dottools.load_config(self._config_path, self._parse_jobs)
+        self.plugins = dottools.create_plugins(cfg)
+        self._fingerprint = self._compute_fingerprint()
+
+
+def _make_handler(state: _WarmState, config_path: str):
+    class _Handler(socketserver.StreamRequestHandler):
+        def _run(self, request) -> int:
+            command = request["command"]
+
+            if request.get("config") != config_path:
+                print(
+                    f"Server is serving {config_path}, not {request.get('config')}",
+                    file=sys.stderr,
+                )
+                return 2
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+
+            override_logger(
+                dottools.create_logger(request["log"], command, request["color"])
+            )
+            fs.reset_stat_cache()
+            context().dry_run = command in dottools.DRY_RUN_COMMANDS
+            state.ensure_loaded()
+
+            if command == "dump":
+                print(tools.safe_dump_yaml(state.yml))
+                return 0
+
+            dottools.run_plugins(
+                dottools.filter_plugins(state.plugins, request["field"]), command
+            )
+
+            return 0
+
+        def handle(self) -> None:
+            request = json.loads(self.rfile.readline())
+            stdout = _StreamWriter(self.wfile, "stdout")
+            stderr = _StreamWriter(self.wfile, "stderr")
+
+            try:
+                with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(
+                    stderr
+                ):
+                    try:
+                        assert (
+                            request["command"] in FORWARDED_COMMANDS
+                        ), f"Command {request['command']} cannot be served"
+                        code = self._run(request)
+                    except Exception:  # pylint: disable=broad-exception-caught
+                        traceback.print_exc()
+                        code = 1
+
+                    logger().flush()
+
+                self.wfile.write(json.dumps({"exit": code}).encode("utf-8") + b"\n")
+            except BrokenPipeError:
+                pass
+
+    return _Handler
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    if not os.path.exists(socket_path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)
+            return
+
+    assert False, f"Another server is already listening on {socket_path}"
+
+
+def serve(config_path: str, socket_path: str, parse_jobs: int = 1) -> None:
+    """
+    Loads the configuration once and serves commands
+    forwarded by clients over a unix socket
+    """
+
+    state = _WarmState(config_path, parse_jobs)
+    loader.retain_included_files(True)
+    state.ensure_loaded()
+
+    _remove_stale_socket(socket_path)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    with socketserver.UnixStreamServer(
+        socket_path, _make_handler(state, config_path)
+    ) as server:
+        logger().info(
+            [
+                "Serving",
+                "socket\t= %s",
+            ],
+            socket_path,
+        )
+        logger().flush()
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
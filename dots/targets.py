@@ -0,0 +1,181 @@
+import os
+import collections
+
+from dots import dottools
+from dots.context import context
+from dots.util import actions
+from dots.util.executor import executor, submit_in_context, MAX_WORKERS
+from dots.util.logger import logger
+from dots.util.profiler import profiler
+
+Target = collections.namedtuple("Target", ["root", "home"])
+
+# A rendered output: blob is the content hash of the lines
+# or the copied file, it is None for links (rejected, see _check_portable)
+_Rendered = collections.namedtuple("_Rendered", ["output", "blob"])
+
+
+def parse_target(spec: str) -> Target:
+    """
+    ROOT    - a home directory, destinations under ctx.home are placed
+              under ROOT, the others are skipped
+    ROOT:HOME - a root file system, every destination is placed under ROOT,
+              ctx.home is replaced with HOME (a path inside ROOT) first
+    """
+    root, _, home = spec.partition(":")
+    assert root, f"Invalid target {spec}"
+    return Target(os.path.abspath(root), home or None)
+
+
+def _within(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def target_path(destination: str, target: Target, home: str):
+    """
+    Returns where destination is placed in the target
+    or None if it cannot be placed there
+    """
+    destination = os.path.abspath(destination)
+
+    if target.home is None:
+        if not _within(destination, home):
+            return None
+
+        return os.path.join(target.root, os.path.relpath(destination, home))
+
+    if _within(destination, home):
+        destination = os.path.join(target.home, os.path.relpath(destination, home))
+
+    return os.path.join(target.root, destination.lstrip(os.sep))
+
+
+def _render(plugins):
+    """
+    Builds the plugins once and returns their outputs along with
+    content hashes, so that equal content is hashed only once
+    """
+    rendered = []
+    source_hashes = {}
+
+    for name, plug in plugins:
+        with logger().indent(label=name), profiler().phase(f"{name}:build"):
+            plug.build()
+
+            for output in plug.outputs():
+                if output.kind == "lines":
+                    blob = actions.hash_content("".join(output.lines))
+                elif output.kind == "copy":
+                    if output.source not in source_hashes:
+                        source_hashes[output.source] = actions.hash_path(output.source)
+
+                    blob = source_hashes[output.source]
+                else:
+                    blob = None
+
+                rendered.append(_Rendered(output, blob))
+
+    return rendered
+
+
+def _check_portable(rendered, home: str) -> None:
+    """
+    Only destinations are moved into targets, links would point
+    to paths of this host. Content is rendered for this host too,
+    paths of its home in it are reported
+    """
+    links = [item.output.destination for item in rendered if item.output.kind == "link"]
+    assert not links, f"Symbolic links cannot be placed into targets: {links}"
+
+    for item in rendered:
+        if item.output.kind == "lines" and any(
+            home in line for line in item.output.lines
+        ):
+            logger().warning(
+                [
+                    "Content refers to the home directory of this host, "
+                    "it is not rewritten for targets",
+                    "path\t= %s",
+                    "home\t= %s",
+                ],
+                item.output.destination,
+                home,
+            )
+
+
+def _is_up_to_date(rendered: _Rendered, path: str) -> bool:
+    if os.path.islink(path) or not os.path.isfile(path):
+        return False
+
+    return actions.hash_path(path) == rendered.blob
+
+
+def _to_action(rendered: _Rendered, path: str) -> actions.Action:
+    output = rendered.output
+
+    if output.kind == "lines":
+        return actions.WriteFile(path, output.lines)
+
+    return actions.CopyFile(output.source, path)
+
+
+def _target_actions(rendered, target: Target, home: str):
+    found = []
+
+    for item in rendered:
+        path = target_path(item.output.destination, target, home)
+
+        if path is None:
+            logger().warning(
+                [
+                    "Destination is outside of home, skipped for the target",
+                    "path\t= %s",
+                    "target\t= %s",
+                ],
+                item.output.destination,
+                target.root,
+            )
+            continue
+
+        if not _is_up_to_date(item, path):
+            found.append(_to_action(item, path))
+
+    return found
+
+
+def apply_to_targets(config_path, field, targets, parse_jobs=1) -> None:
+    """
+    Renders outputs of the plugins once and places
+    them into every target, targets are compared concurrently
+    """
+    targets = [parse_target(spec) for spec in targets]
+    _, cfg = dottools.load_config(config_path, parse_jobs)
+    rendered = _render(dottools.create_plugins(cfg, field))
+    home = context().home
+    _check_portable(rendered, home)
+
+    with profiler().phase("targets.difference"):
+        if len(targets) > 1:
+            from concurrent import futures
+
+            with futures.ThreadPoolExecutor(
+                max_workers=min(MAX_WORKERS, len(targets))
+            ) as pool:
+                per_target = [
+                    future.result()
+                    for future in [
+                        submit_in_context(pool, _target_actions, rendered, target, home)
+                        for target in targets
+                    ]
+                ]
+        else:
+            per_target = [_target_actions(rendered, targets[0], home)]
+
+    # Writes into all the targets are performed by the executor's pool
+    with executor().batch():
+        for target, target_actions in zip(targets, per_target):
+            if not target_actions:
+                logger().info(f"No difference in {target.root}, nothing done")
+
+            for action in target_actions:
+                executor().submit(action)
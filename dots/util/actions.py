@@ -0,0 +1,305 @@
+import io
+import os
+import stat
+import shutil
+import hashlib
+from typing import Optional
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return f"sha256:{digest.hexdigest()}"
+
+
+def hash_content(content: str) -> str:
+    return f"sha256:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+
+def hash_path(path: str) -> Optional[str]:
+    """
+    Returns a hash describing the current state of path:
+    None if it does not exist, link target for symlinks,
+    content hash for files and hash of all entries for directories
+    """
+
+    if os.path.islink(path):
+        return f"link:{os.readlink(path)}"
+
+    if os.path.isfile(path):
+        return _hash_file(path)
+
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+
+        for name in sorted(os.listdir(path)):
+            digest.update(f"{name}\0{hash_path(os.path.join(path, name))}\0".encode())
+
+        return f"tree:{digest.hexdigest()}"
+
+    return None
+
+
+class Action:
+    """
+    A single change of the file system done by a plugin
+    """
+
+    kind = None
+
+    def __init__(self, target: str) -> None:
+        self.target = target
+        self.pre_hash = None
+
+    def capture_pre_state(self) -> None:
+        self.pre_hash = hash_path(self.target)
+
+    def log_message(self):
+        """
+        Returns (fmt, args) to be logged under Tags.ACTION
+        """
+        raise NotImplementedError()
+
+    def perform(self) -> None:
+        raise NotImplementedError()
+
+    def stale_reasons(self):
+        """
+        Returns a list of reasons why the action recorded
+        earlier cannot be performed now (empty if it can)
+        """
+        current = hash_path(self.target)
+
+        if current != self.pre_hash:
+            return [f"{self.target} has changed: {self.pre_hash} -> {current}"]
+
+        return []
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "target": self.target,
+            "pre_hash": self.pre_hash,
+        }
+
+
+class MakeDir(Action):
+    kind = "mkdir"
+
+    def log_message(self):
+        return [
+            "creating directory",
+            "path\t= %s",
+        ], [self.target]
+
+    def perform(self) -> None:
+        os.makedirs(self.target, exist_ok=True)
+
+    def stale_reasons(self):
+        # Creating a directory is idempotent
+        return []
+
+
+class WriteFile(Action):
+    kind = "write"
+
+    def __init__(self, path: str, lines) -> None:
+        super().__init__(path)
+        self.lines = lines
+
+    def log_message(self):
+        return [
+            "writing content to file",
+            "path\t= %s",
+        ], [self.target]
+
+    def perform(self) -> None:
+        with open(self.target, "w", encoding="utf-8") as file:
+            file.writelines(self.lines)
+
+    def to_dict(self):
+        content = "".join(self.lines)
+        return super().to_dict() | {
+            "hash": hash_content(content),
+            "content": content,
+        }
+
+
+class CopyFile(Action):
+    kind = "copy"
+
+    def __init__(self, src: str, dst: str) -> None:
+        super().__init__(dst)
+        self.src = src
+        self.src_hash = None
+
+    def capture_pre_state(self) -> None:
+        super().capture_pre_state()
+        self.src_hash = hash_path(self.src)
+
+    def log_message(self):
+        return [
+            "copying file",
+            "src\t= %s",
+            "dst\t= %s",
+        ], [self.src, self.target]
+
+    def perform(self) -> None:
+        shutil.copy(self.src, self.target)
+
+    def stale_reasons(self):
+        reasons = super().stale_reasons()
+        current = hash_path(self.src)
+
+        if current != self.src_hash:
+            reasons.append(f"{self.src} has changed: {self.src_hash} -> {current}")
+
+        return reasons
+
+    def to_dict(self):
+        return super().to_dict() | {
+            "src": self.src,
+            "hash": self.src_hash,
+        }
+
+
+class DeltaWriteFile(WriteFile):
+    """
+    Writes only the blocks of the existing file that differ from the content
+    """
+
+    kind = "delta-write"
+
+    def __init__(self, path: str, lines, block_size: int) -> None:
+        super().__init__(path, lines)
+        self.block_size = block_size
+
+    def log_message(self):
+        return [
+            "updating changed blocks of file",
+            "path\t= %s",
+        ], [self.target]
+
+    def perform(self) -> None:
+        from dots.util import delta
+
+        content = io.BytesIO("".join(self.lines).encode("utf-8"))
+        delta.patch_file(self.target, content, self.block_size)
+
+    def to_dict(self):
+        return super().to_dict() | {
+            "block_size": self.block_size,
+        }
+
+
+class DeltaCopyFile(CopyFile):
+    """
+    Copies only the blocks of the source that differ from the existing file
+    """
+
+    kind = "delta-copy"
+
+    def __init__(self, src: str, dst: str, block_size: int) -> None:
+        super().__init__(src, dst)
+        self.block_size = block_size
+
+    def log_message(self):
+        return [
+            "copying changed blocks of file",
+            "src\t= %s",
+            "dst\t= %s",
+        ], [self.src, self.target]
+
+    def perform(self) -> None:
+        from dots.util import delta
+
+        with open(self.src, "rb") as source:
+            delta.patch_file(self.target, source, self.block_size)
+
+        # Same as the whole file copy
+        shutil.copymode(self.src, self.target)
+
+    def to_dict(self):
+        return super().to_dict() | {
+            "block_size": self.block_size,
+        }
+
+
+class Remove(Action):
+    kind = "remove"
+
+    def log_message(self):
+        return [
+            "trying to remove path",
+            "path\t= %s",
+        ], [self.target]
+
+    def perform(self) -> None:
+        try:
+            mode = os.lstat(self.target).st_mode
+        except FileNotFoundError:
+            return
+
+        if stat.S_ISDIR(mode):
+            shutil.rmtree(self.target)
+        else:
+            os.remove(self.target)
+
+
+class Link(Action):
+    kind = "link"
+
+    def __init__(self, src: str, dst: str) -> None:
+        super().__init__(dst)
+        self.src = src
+
+    def log_message(self):
+        return [
+            "creating a symbolic link",
+            "src\t= %s",
+            "dst\t= %s",
+        ], [self.src, self.target]
+
+    def perform(self) -> None:
+        os.symlink(self.src, self.target, target_is_directory=True)
+
+    def to_dict(self):
+        return super().to_dict() | {
+            "src": self.src,
+        }
+
+
+def from_dict(obj) -> Action:
+    kind = obj["kind"]
+
+    if kind == WriteFile.kind:
+        action = WriteFile(obj["target"], obj["content"].splitlines(keepends=True))
+    elif kind == DeltaWriteFile.kind:
+        action = DeltaWriteFile(
+            obj["target"],
+            obj["content"].splitlines(keepends=True),
+            obj["block_size"],
+        )
+    elif kind == CopyFile.kind:
+        action = CopyFile(obj["src"], obj["target"])
+        action.src_hash = obj["hash"]
+    elif kind == DeltaCopyFile.kind:
+        action = DeltaCopyFile(obj["src"], obj["target"], obj["block_size"])
+        action.src_hash = obj["hash"]
+    elif kind == MakeDir.kind:
+        action = MakeDir(obj["target"])
+    elif kind == Remove.kind:
+        action = Remove(obj["target"])
+    elif kind == Link.kind:
+        action = Link(obj["src"], obj["target"])
+    else:
+        assert False, f"Unknown action kind {kind}"
+
+    action.pre_hash = obj["pre_hash"]
+    return action
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from typing import Optional
+
+from dots.util import actions, env
+from dots.util.logger import logger, Tags
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def default_state_dir() -> str:
+    if os.getenv(env.STATE_DIR_ENV_VAR):
+        return os.getenv(env.STATE_DIR_ENV_VAR)
+
+    state_home = os.getenv("XDG_STATE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "state"
+    )
+    return os.path.join(state_home, "dottools")
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class BackupStore:
+    """
+    Saves what is at a path before an action destroys it. File contents
+    are kept once per sha256 in objects/, a run's index (runs/<id>.json)
+    lists the saved paths in the order they were changed
+    """
+
+    def __init__(self, state_dir: str) -> None:
+        self._objects_dir = os.path.join(state_dir, "backup", "objects")
+        self._runs_dir = os.path.join(state_dir, "backup", "runs")
+        self._lock = threading.Lock()
+        self._saved = set()
+        self._entries = []
+        self.run_id = None
+
+    def start_run(self) -> str:
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._saved = set()
+        self._entries = []
+        return self.run_id
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects_dir, digest[:2], digest[2:])
+
+    def _store_file(self, path: str, hardlink: bool) -> str:
+        digest = _file_digest(path)
+        object_path = self._object_path(digest)
+
+        if os.path.exists(object_path):
+            return digest
+
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        temporary = f"{object_path}.{threading.get_ident()}.tmp"
+
+        # A removed file is unlinked, its inode can be kept instead of
+        # copying the content. An overwritten one is truncated in place,
+        # so its content has to be copied
+        try:
+            if hardlink:
+                os.link(path, temporary)
+            else:
+                shutil.copyfile(path, temporary)
+        except OSError:
+            shutil.copyfile(path, temporary)
+
+        os.replace(temporary, object_path)
+        return digest
+
+    def _describe(self, path: str, hardlink: bool):
+        if os.path.islink(path):
+            return [{"path": path, "kind": "link", "target": os.readlink(path)}]
+
+        if os.path.isfile(path):
+            return [
+                {
+                    "path": path,
+                    "kind": "file",
+                    "mode": os.stat(path).st_mode & 0o7777,
+                    "hash": self._store_file(path, hardlink),
+                }
+            ]
+
+        if os.path.isdir(path):
+            entries = [
+                {"path": path, "kind": "dir", "mode": os.stat(path).st_mode & 0o7777}
+            ]
+
+            for name in sorted(os.listdir(path)):
+                entries.extend(self._describe(os.path.join(path, name), hardlink))
+
+            return entries
+
+        return [{"path": path, "kind": "absent"}]
+
+    @staticmethod
+    def _missing_directories(path: str):
+        """
+        Returns directories makedirs(path) would create, outermost first
+        """
+        missing = []
+
+        while not os.path.lexists(path) and os.path.dirname(path) != path:
+            missing.append(path)
+            path = os.path.dirname(path)
+
+        return missing[::-1]
+
+    def save(self, action: actions.Action) -> None:
+        """
+        Saves the current state of the action's target,
+        only the first action on a path in a run saves it.
+        Directories created by MakeDir are recorded as such
+        """
+        if isinstance(action, actions.MakeDir):
+            entries = [
+                {"path": path, "kind": "created-dir"}
+                for path in self._missing_directories(action.target)
+            ]
+
+            with self._lock:
+                self._entries.extend(entries)
+
+            return
+
+        with self._lock:
+            if action.target in self._saved:
+                return
+
+            self._saved.add(action.target)
+
+        entries = self._describe(
+            action.target, hardlink=isinstance(action, actions.Remove)
+        )
+
+        with self._lock:
+            self._entries.extend(entries)
+
+    def finish(self) -> Optional[str]:
+        """
+        Writes the run's index, returns the run id
+        or None if nothing has been saved
+        """
+        if not self._entries:
+            return None
+
+        os.makedirs(self._runs_dir, exist_ok=True)
+
+        with open(
+            os.path.join(self._runs_dir, f"{self.run_id}.json"), "w", encoding="utf-8"
+        ) as file:
+            json.dump({"run": self.run_id, "entries": self._entries}, file, indent=2)
+
+        return self.run_id
+
+    def runs(self):
+        if not os.path.isdir(self._runs_dir):
+            return []
+
+        return sorted(
+            name.removesuffix(".json")
+            for name in os.listdir(self._runs_dir)
+            if name.endswith(".json")
+        )
+
+    def _restore_entry(self, entry) -> None:
+        path = entry["path"]
+        kind = entry["kind"]
+
+        if kind == "dir" and os.path.isdir(path) and not os.path.islink(path):
+            os.chmod(path, entry["mode"])
+            return
+
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.remove(path)
+
+        if kind == "absent":
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if kind == "dir":
+            os.makedirs(path)
+            os.chmod(path, entry["mode"])
+        elif kind == "link":
+            os.symlink(entry["target"], path)
+        elif kind == "file":
+            shutil.copyfile(self._object_path(entry["hash"]), path)
+            os.chmod(path, entry["mode"])
+        else:
+            assert False, f"Unknown backup entry kind {kind}"
+
+    def rollback(self, run_id: str, dry_run: bool = False) -> None:
+        """
+        Restores paths changed by the run to the state they had before it
+        """
+        index_path = os.path.join(self._runs_dir, f"{run_id}.json")
+        assert os.path.isfile(index_path), f"Backup run {run_id} not found"
+
+        with open(index_path, "r", encoding="utf-8") as file:
+            entries = json.load(file)["entries"]
+
+        created = [entry for entry in entries if entry["kind"] == "created-dir"]
+
+        # Parents are listed before their content
+        for entry in entries:
+            if entry["kind"] == "created-dir":
+                continue
+
+            logger().log(
+                Tags.ACTION,
+                [
+                    "restoring path",
+                    "path\t= %s",
+                    "kind\t= %s",
+                ],
+                entry["path"],
+                entry["kind"],
+            )
+
+            if not dry_run:
+                self._restore_entry(entry)
+
+        # Created directories are removed once their content is, deepest first
+        for entry in sorted(
+            created, key=lambda entry: entry["path"].count(os.sep), reverse=True
+        ):
+            logger().log(
+                Tags.ACTION,
+                [
+                    "removing created directory if empty",
+                    "path\t= %s",
+                ],
+                entry["path"],
+            )
+
+            if not dry_run:
+                try:
+                    os.rmdir(entry["path"])
+                except OSError:
+                    pass
+
+
+_GLOBAL_BACKUP_STORE = None
+
+
+def override_backup_store(store: Optional[BackupStore]) -> None:
+    global _GLOBAL_BACKUP_STORE  # pylint: disable=global-variable-not-assigned,global-statement
+    _GLOBAL_BACKUP_STORE = store
+
+
+def backup_store() -> Optional[BackupStore]:
+    global _GLOBAL_BACKUP_STORE  # pylint: disable=global-variable-not-assigned,global-statement
+    return _GLOBAL_BACKUP_STORE
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Optional
 
 _COLORMAP = {
@@ -40,7 +41,46 @@ def _get_font(name: str) -> int:
     return _FONTMAP.get(name, -1)
 
 
+_ESC = "\033"
+_RESET = f"{_ESC}[0m"
+
+
+# Each (fg, bg, font) combination is built once, on first use
+@lru_cache(maxsize=None)
+def _sequence(fg: Optional[str], bg: Optional[str], font: Optional[str]) -> str:
+    result = f"{_ESC}[0;{_color_fg(fg or '')}m"
+
+    if fg is not None:
+        result += f"{_ESC}[{_color_fg(fg)}m"
+
+    if bg is not None:
+        result += f"{_ESC}[{_color_bg(bg)}m"
+
+    if font is not None:
+        result += f"{_ESC}[{_get_font(font)}m"
+
+    return result
+
+
+_enabled = True
+
+
+def set_enabled(enabled: bool) -> None:
+    """
+    Disabled colors make fmt() and fmt_line() return text as is
+    """
+    global _enabled  # pylint: disable=global-statement
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
+
+
 def fmt_line(line: str, fg=None, bg=None, font=None):
+    if not _enabled:
+        return line
+
     if line[-1] != "\n":
         return fmt(line, fg, bg, font)
 
@@ -53,23 +93,7 @@ def fmt(
     bg: Optional[str] = None,
     font: Optional[str] = None,
 ):
-    result = "{esc}[0;{fg}m"
-
-    if fg is not None:
-        result += "{esc}[{fg}m"
-
-    if bg is not None:
-        result += "{esc}[{bg}m"
-
-    if font is not None:
-        result += "{esc}[{font}m"
-
-    result += "{text}{esc}[0m"
+    if not _enabled:
+        return text
 
-    return result.format(
-        esc="\033",
-        text=text,
-        fg=_color_fg(fg or ""),
-        bg=_color_bg(bg or ""),
-        font=_get_font(font or ""),
-    )
+    return _sequence(fg, bg, font) + text + _RESET
@@ -0,0 +1,72 @@
+import collections
+from typing import Optional
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+DEFAULT_MIN_SIZE = 1024 * 1024
+
+# Files of at least min_size bytes are updated block by block
+DeltaOptions = collections.namedtuple("DeltaOptions", ["min_size", "block_size"])
+
+
+def options_from_config(config) -> Optional[DeltaOptions]:
+    """
+    Reads delta options of a plugin (inherited from parents):
+
+        delta:
+            min-size: 1048576   # smaller files are rewritten whole
+            block-size: 65536
+
+    Returns None if delta updates are not enabled
+    """
+    delta = config.getp("delta", None)
+
+    if delta is None or not delta.istype(dict):
+        return None
+
+    options = DeltaOptions(
+        min_size=delta.get("min-size", DEFAULT_MIN_SIZE).astype(int),
+        block_size=delta.get("block-size", DEFAULT_BLOCK_SIZE).astype(int),
+    )
+    assert options.block_size > 0, f"Invalid delta block size {options.block_size}"
+    return options
+
+
+def applies(options: Optional[DeltaOptions], path: str, size: int) -> bool:
+    """
+    Whether the existing file at path should be updated
+    in place rather than rewritten with size bytes
+    """
+    from dots.util.fs import stat_cache
+
+    if options is None or size < options.min_size:
+        return False
+
+    return stat_cache().isfile(path) and not stat_cache().islink(path)
+
+
+def patch_file(path: str, source, block_size: int) -> int:
+    """
+    Makes the file at path equal to the content of the binary stream
+    source writing only the blocks that differ and truncating the rest.
+    Returns number of bytes written
+    """
+    written = 0
+    offset = 0
+
+    with open(path, "r+b") as out:
+        while True:
+            new = source.read(block_size)
+
+            if not new:
+                break
+
+            if out.read(len(new)) != new:
+                out.seek(offset)
+                out.write(new)
+                written += len(new)
+
+            offset += len(new)
+
+        out.truncate(offset)
+
+    return written
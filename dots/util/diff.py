@@ -1,9 +1,13 @@
-import difflib
+import itertools
 
 from dots.util import colors
 
+TRUNCATED_NOTE = "... (difference truncated)\n"
+
 
 def get_diff_line(string_a, string_b):
+    import difflib
+
     output = []
     matcher = difflib.SequenceMatcher(None, string_a, string_b)
 
@@ -44,6 +48,8 @@ def _get_diff_lines(
     tofiledate=None,
     lineterm="\n",
 ):
+    import difflib
+
     n = 2
     started = False
     for group in difflib.SequenceMatcher(None, a, b).get_grouped_opcodes(n):
@@ -75,6 +81,16 @@ def _get_diff_lines(
                 for line in b[j1:j2]:
                     yield colors.fmt_line("+" + line, bg="green")
 
+            if tag == "replace" and not colors.enabled():
+                # Inline changes cannot be told apart without colors
+                for line in a[i1:i2]:
+                    yield "-" + line
+
+                for line in b[j1:j2]:
+                    yield "+" + line
+
+                continue
+
             if tag == "replace":
                 for i in range(min(len(a[i1:i2]), len(b[j1:j2]))):
                     yield colors.fmt_line("~", bg="light_cyan") + get_diff_line(
@@ -92,8 +108,27 @@ def _get_diff_lines(
 
 
 def get_diff_lines(
-    a, b, fromfile="", tofile="", fromfiledate=None, tofiledate=None, lineterm="\n"
+    a,
+    b,
+    fromfile="",
+    tofile="",
+    fromfiledate=None,
+    tofiledate=None,
+    lineterm="\n",
+    limit=None,
 ):
-    return list(
-        _get_diff_lines(a, b, fromfile, tofile, fromfiledate, tofiledate, lineterm)
-    )
+    """
+    Returns lines of the unified diff, at most limit of them
+    (followed by a note that the rest is not shown) if it is given
+    """
+    lines = _get_diff_lines(a, b, fromfile, tofile, fromfiledate, tofiledate, lineterm)
+
+    if limit is None:
+        return list(lines)
+
+    result = list(itertools.islice(lines, limit))
+
+    if next(lines, None) is not None:
+        result.append(TRUNCATED_NOTE)
+
+    return result
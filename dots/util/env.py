@@ -7,3 +7,5 @@ ROOT_PATH_ENV_VAR = f"{_PREFIX}_ROOT_PATH"
 BASHRCD_PATH_ENV = f"{_PREFIX}_BASHRCD_PATH"
 SCRIPTS_PATH_ENV = f"{_PREFIX}_SCRIPTS_PATH"
 PROMPT_ENV_VAR = f"{_PREFIX}_PROMPT"
+SOCKET_PATH_ENV_VAR = f"{_PREFIX}_SOCKET_PATH"
+STATE_DIR_ENV_VAR = f"{_PREFIX}_STATE_DIR"
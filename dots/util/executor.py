@@ -0,0 +1,277 @@
+import os
+import time
+import threading
+import contextlib
+import contextvars
+import collections
+
+from dots.context import context
+from dots.util import actions, backup, plan
+from dots.util.logger import logger, Tags
+from dots.util.profiler import profiler
+
+MAX_WORKERS = 8
+
+# Name of the plugin submitting actions (see Executor.owner())
+_OWNER = contextvars.ContextVar("executor_owner", default=None)
+
+# Where a pending action comes from: the context it was submitted in
+# (it is logged with the labels of the submitter) and the owning plugin
+_Origin = collections.namedtuple("_Origin", ["context", "owner"])
+
+
+def submit_in_context(pool, fn, *args):
+    """
+    Submits fn to the thread pool to be run in a copy of the current
+    context, so that it logs with the indentation of the caller
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _is_within(path: str, directory: str) -> bool:
+    return path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+class Executor:
+    """
+    Collects actions submitted by plugins and performs them at once:
+    missing parent directories are created first (each one once),
+    then files are written, copied and linked concurrently
+    and removals are done last
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self._max_workers = max_workers
+        self._pending = []
+        self._origins = {}
+        self._batch_depth = 0
+        self._collected = None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Actions submitted within the block are performed when it exits.
+        If the block raises, the actions submitted so far are performed
+        before the error is propagated, except for the ones of the plugin
+        that failed (see owner()), so a batch is not all-or-nothing
+        """
+        self._batch_depth += 1
+
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+
+            if self._batch_depth == 0:
+                self.flush()
+
+    @contextlib.contextmanager
+    def owner(self, name: str):
+        """
+        Actions submitted within the block belong to the plugin name:
+        they are timed as its apply phase and are dropped if the block raises
+        """
+        token = _OWNER.set(name)
+        start = len(self._pending)
+
+        try:
+            yield
+        except BaseException:
+            for action in self._pending[start:]:
+                self._origins.pop(action, None)
+
+            del self._pending[start:]
+            raise
+        finally:
+            _OWNER.reset(token)
+
+    @contextlib.contextmanager
+    def collect(self):
+        """
+        Actions submitted within the block are neither logged nor
+        performed, they are appended to the list the block gets
+        """
+        saved, self._collected = self._collected, []
+
+        try:
+            yield self._collected
+        finally:
+            self._collected = saved
+
+    def submit(self, action: actions.Action) -> None:
+        if self._collected is not None:
+            self._collected.append(action)
+            return
+
+        self._pending.append(action)
+        self._origins[action] = _Origin(contextvars.copy_context(), _OWNER.get())
+
+        if self._batch_depth == 0:
+            self.flush()
+
+    def flush_writing(self, paths) -> None:
+        """
+        Performs the pending actions if any of them writes one of paths,
+        a path within them or a directory containing them, so that
+        a plugin reading what another one writes sees the result
+        """
+        paths = [os.path.abspath(path) for path in paths]
+
+        if any(
+            action.target == path
+            or _is_within(action.target, path)
+            or _is_within(path, action.target)
+            for action in self._pending
+            for path in paths
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, []
+        origins, self._origins = self._origins, {}
+
+        if not pending:
+            return
+
+        timings = {}
+
+        with profiler().phase("actions"):
+            for stage in self._stages(pending):
+                for action in stage:
+                    _log_action(action, origins.get(action))
+                    plan.record(action)
+
+                # Shows what is being done before slow actions run
+                logger().flush()
+
+                if not context().dry_run:
+                    self._perform(stage, origins, timings)
+
+        for owner, (wall, cpu) in timings.items():
+            profiler().record(f"{owner}:apply", wall, cpu)
+
+    @staticmethod
+    def _stages(pending):
+        # fs submits actions to the executor, so it is imported here
+        from dots.util import fs
+
+        directories = {
+            action.target for action in pending if isinstance(action, actions.MakeDir)
+        }
+        directories.update(
+            os.path.dirname(action.target)
+            for action in pending
+            if not isinstance(action, (actions.MakeDir, actions.Remove))
+        )
+
+        # makedirs creates all the parents, so only the deepest
+        # missing directories have to be created
+        missing = [
+            directory
+            for directory in directories
+            if not fs.stat_cache().isdir(directory)
+        ]
+        make_dirs = [
+            actions.MakeDir(directory)
+            for directory in sorted(missing)
+            if not any(_is_within(other, directory) for other in missing)
+        ]
+
+        changes = [
+            action
+            for action in pending
+            if not isinstance(action, (actions.MakeDir, actions.Remove))
+        ]
+
+        # Nested paths go first so that a removed directory
+        # does not disappear under removal of its content
+        removals = sorted(
+            (action for action in pending if isinstance(action, actions.Remove)),
+            key=lambda action: action.target.count(os.sep),
+            reverse=True,
+        )
+
+        return [make_dirs, changes, removals]
+
+    def _perform(self, stage, origins, timings) -> None:
+        # Actions on the same target keep the order they were submitted in
+        by_target = {}
+        for action in stage:
+            by_target.setdefault(action.target, []).append(action)
+
+        groups = list(by_target.values())
+
+        if (
+            self._max_workers <= 1
+            or len(groups) <= 1
+            or any(isinstance(action, actions.Remove) for action in stage)
+        ):
+            for group in groups:
+                _perform_group(group, origins, timings)
+            return
+
+        from concurrent import futures
+
+        with futures.ThreadPoolExecutor(
+            max_workers=min(self._max_workers, len(groups))
+        ) as pool:
+            for future in [
+                submit_in_context(pool, _perform_group, group, origins, timings)
+                for group in groups
+            ]:
+                future.result()
+
+
+def _log_action(action: actions.Action, origin) -> None:
+    fmt, args = action.log_message()
+
+    if origin is None:
+        # Parent directories are added by the executor itself
+        with logger().indent(label="actions"):
+            logger().log(Tags.ACTION, fmt, *args)
+        return
+
+    origin.context.run(logger().log, Tags.ACTION, fmt, *args)
+
+
+_timings_lock = threading.Lock()
+
+
+def _perform_group(group, origins, timings) -> None:
+    # fs submits actions to the executor, so it is imported here
+    from dots.util import fs
+
+    store = backup.backup_store()
+
+    for action in group:
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+
+        if store is not None:
+            store.save(action)
+
+        action.perform()
+        fs.stat_cache().invalidate(action.target)
+
+        origin = origins.get(action)
+
+        if origin is not None and origin.owner is not None:
+            with _timings_lock:
+                total_wall, total_cpu = timings.get(origin.owner, (0.0, 0.0))
+                timings[origin.owner] = (
+                    total_wall + time.perf_counter() - wall,
+                    total_cpu + time.thread_time() - cpu,
+                )
+
+
+_GLOBAL_EXECUTOR = Executor()
+
+
+def override_executor(executor_instance: Executor) -> None:
+    global _GLOBAL_EXECUTOR  # pylint: disable=global-variable-not-assigned,global-statement
+    _GLOBAL_EXECUTOR = executor_instance
+
+
+def executor() -> Executor:
+    global _GLOBAL_EXECUTOR  # pylint: disable=global-variable-not-assigned,global-statement
+    return _GLOBAL_EXECUTOR
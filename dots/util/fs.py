@@ -1,56 +1,154 @@
 import os
-import shutil
+import stat
+import codecs
 from typing import Callable, Any
 
-from dots.context import context
-from dots.util import diff
-from dots.util.logger import logger, Tags
+from dots.util import actions, delta, diff
+from dots.util.executor import executor
+from dots.util.logger import logger
 
+# Larger files are compared without a text diff
+TEXT_DIFF_MAX_SIZE = 1024 * 1024
+
+_SNIFF_SIZE = 8192
+_CHUNK_SIZE = 1024 * 1024
 
-def _create_parent_dir_if_not_exists(file_path: str) -> None:
-    dir_name = os.path.dirname(file_path)
 
-    if os.path.isdir(dir_name):
-        return
+class StatCache:
+    """
+    Remembers results of stat() and lstat() calls during a run, so that
+    every path is looked up at most once. Actions performed by the executor
+    invalidate their targets, changes made by anything else are not seen
+    until the cache is reset
+    """
+
+    def __init__(self) -> None:
+        self._lstats = {}
+        self._stats = {}
+        # Cached paths by their parent directories
+        self._children = {}
+
+    @staticmethod
+    def _cached(cache, function, path: str):
+        if path in cache:
+            return cache[path]
+
+        try:
+            result = function(path)
+        except OSError:
+            result = None
+
+        cache[path] = result
+        return result
+
+    def lstat(self, path: str):
+        """
+        Returns os.lstat(path) or None if path does not exist
+        """
+        path = os.path.abspath(path)
+
+        if path not in self._lstats:
+            self._children.setdefault(os.path.dirname(path), set()).add(path)
+
+        return self._cached(self._lstats, os.lstat, path)
+
+    def stat(self, path: str):
+        """
+        Returns os.stat(path) or None if path (or the target of the link)
+        does not exist
+        """
+        path = os.path.abspath(path)
+        result = self.lstat(path)
+
+        if result is None or not stat.S_ISLNK(result.st_mode):
+            return result
+
+        return self._cached(self._stats, os.stat, path)
+
+    def exists(self, path: str) -> bool:
+        return self.stat(path) is not None
+
+    def isfile(self, path: str) -> bool:
+        result = self.stat(path)
+        return result is not None and stat.S_ISREG(result.st_mode)
+
+    def isdir(self, path: str) -> bool:
+        result = self.stat(path)
+        return result is not None and stat.S_ISDIR(result.st_mode)
+
+    def islink(self, path: str) -> bool:
+        result = self.lstat(path)
+        return result is not None and stat.S_ISLNK(result.st_mode)
+
+    def size(self, path: str):
+        """
+        Returns size of the file at path or None if it does not exist
+        """
+        result = self.stat(path)
+        return None if result is None else result.st_size
 
-    logger().log(
-        Tags.ACTION,
-        [
-            "creating parent directory",
-            "path\t= %s",
-            "dir\t= %s",
-        ],
-        file_path,
-        dir_name,
-    )
+    def invalidate(self, path: str) -> None:
+        """
+        Forgets path, its parents (they may have been created)
+        and everything under it (it may have been a directory)
+        """
+        path = os.path.abspath(path)
+        parent = path
 
-    if not context().dry_run:
-        os.makedirs(dir_name, exist_ok=True)
+        while True:
+            self._lstats.pop(parent, None)
+            self._stats.pop(parent, None)
+
+            if os.path.dirname(parent) == parent:
+                break
+
+            parent = os.path.dirname(parent)
+
+        queue = [path]
+
+        while queue:
+            for child in self._children.pop(queue.pop(), ()):
+                self._lstats.pop(child, None)
+                self._stats.pop(child, None)
+                queue.append(child)
+
+    def clear(self) -> None:
+        self._lstats = {}
+        self._stats = {}
+        self._children = {}
+
+
+_GLOBAL_STAT_CACHE = StatCache()
+
+
+def reset_stat_cache() -> None:
+    """
+    Starts a new run: paths may have been changed outside of dots
+    """
+    stat_cache().clear()
+
+
+def stat_cache() -> StatCache:
+    global _GLOBAL_STAT_CACHE  # pylint: disable=global-variable-not-assigned,global-statement
+    return _GLOBAL_STAT_CACHE
+
+
+def run_action(action: actions.Action) -> None:
+    """
+    Submits the action to the executor which logs it, records it
+    if a plan is being recorded and performs it unless in dry-run mode
+    """
+    executor().submit(action)
 
 
 def try_remove(file: str) -> None:
-    logger().log(
-        Tags.ACTION,
-        [
-            "trying to remove path",
-            "path\t= %s",
-        ],
-        file,
-    )
-
-    if not context().dry_run:
-        if os.path.isfile(file) or os.path.islink(file):
-            os.remove(file)
-        elif os.path.isdir(file):
-            shutil.rmtree(file)
-        elif os.path.islink(file):
-            os.unlink(file)
+    run_action(actions.Remove(file))
 
 
 def read_lines_or_empty(file: str):
     file = os.path.expanduser(file)
 
-    if not os.path.exists(file):
+    if not stat_cache().exists(file):
         logger().warning(
             [
                 "path does not exist, no lines read",
@@ -64,72 +162,104 @@ def read_lines_or_empty(file: str):
         return list(file_obj.readlines())
 
 
-def write_lines(lines, path: str) -> None:
-    _create_parent_dir_if_not_exists(path)
+def write_lines(lines, path: str, delta_options=None) -> None:
+    if delta_options is not None and delta.applies(
+        delta_options, path, sum(len(line.encode("utf-8")) for line in lines)
+    ):
+        run_action(actions.DeltaWriteFile(path, lines, delta_options.block_size))
+        return
+
+    run_action(actions.WriteFile(path, lines))
 
-    logger().log(
-        Tags.ACTION,
-        [
-            "writing content to file",
-            "path\t= %s",
-        ],
-        path,
-    )
 
-    if not context().dry_run:
-        with open(path, "w", encoding="utf-8") as file:
-            file.writelines(lines)
+def copy_file(src: str, dst: str, delta_options=None) -> None:
+    if delta.applies(delta_options, dst, stat_cache().size(src)):
+        run_action(actions.DeltaCopyFile(src, dst, delta_options.block_size))
+        return
 
+    run_action(actions.CopyFile(src, dst))
 
-def copy_file(src: str, dst: str) -> None:
-    _create_parent_dir_if_not_exists(dst)
 
-    logger().log(
-        Tags.ACTION,
-        [
-            "copying file",
-            "src\t= %s",
-            "dst\t= %s",
-        ],
-        src,
-        dst,
-    )
+def link_directory(src: str, dst: str) -> None:
+    run_action(actions.Link(src, dst))
 
-    if not context().dry_run:
-        shutil.copy(src, dst)
 
+def is_binary(path: str) -> bool:
+    """
+    Sniffs the first block of the file: it is binary
+    if it has NUL bytes or is not valid UTF-8
+    """
+    with open(path, "rb") as file:
+        block = file.read(_SNIFF_SIZE)
 
-def link_directory(src: str, dst: str) -> None:
-    _create_parent_dir_if_not_exists(dst)
+    if b"\0" in block:
+        return True
 
-    logger().log(
-        Tags.ACTION,
-        [
-            "creating a symbolic link",
-            "src\t= %s",
-            "dst\t= %s",
-        ],
-        src,
-        dst,
-    )
+    try:
+        # Not final: the block may end in the middle of a character
+        codecs.getincrementaldecoder("utf-8")().decode(block, final=False)
+    except UnicodeDecodeError:
+        return True
 
-    if not context().dry_run:
-        os.symlink(src, dst, target_is_directory=True)
+    return False
 
 
-def files_difference(src: str, dst: str):
-    return diff.get_diff_lines(
-        read_lines_or_empty(dst),
-        read_lines_or_empty(src),
-    )
+def same_content(path_a: str, path_b: str) -> bool:
+    """
+    Compares the files in chunks without decoding them
+    """
+    if stat_cache().size(path_a) != stat_cache().size(path_b):
+        return False
 
+    with open(path_a, "rb") as file_a, open(path_b, "rb") as file_b:
+        while True:
+            chunk_a = file_a.read(_CHUNK_SIZE)
 
-def recurse_directories(
-    src: str,
-    dst: str,
-    function: Callable[[str, str], None],
-    ignore_regex,
+            if chunk_a != file_b.read(_CHUNK_SIZE):
+                return False
+
+            if not chunk_a:
+                return True
+
+
+def _format_size(size) -> str:
+    return "missing" if size is None else str(size)
+
+
+def files_difference(
+    src: str, dst: str, max_text_size: int = TEXT_DIFF_MAX_SIZE, max_lines=None
 ):
+    """
+    Returns diff lines (at most max_lines if given) turning dst into src.
+    Binary files and files larger than max_text_size bytes
+    are only compared, not diffed
+    """
+    src_size, dst_size = stat_cache().size(src), stat_cache().size(dst)
+    binary = is_binary(src) or (dst_size is not None and is_binary(dst))
+    too_large = max(src_size or 0, dst_size or 0) > max_text_size
+
+    if not binary and not too_large:
+        return diff.get_diff_lines(
+            read_lines_or_empty(dst),
+            read_lines_or_empty(src),
+            limit=max_lines,
+        )
+
+    if dst_size is not None and same_content(src, dst):
+        return []
+
+    kind = "binary" if binary else "large"
+    return [
+        f"{kind} files differ (size {_format_size(dst_size)} → "
+        f"{_format_size(src_size)})\n"
+    ]
+
+
+def walk_directories(src: str, dst: str, ignore_regex):
+    """
+    Yields (file in src, corresponding path in dst) pairs
+    of files not matching any of ignore_regex
+    """
     src = os.path.abspath(src)
     dst = os.path.abspath(dst)
 
@@ -143,22 +273,23 @@ def recurse_directories(
         )
         return
 
-    if os.path.isfile(src):
-        function(src, dst)
+    if stat_cache().isfile(src):
+        yield src, dst
         return
 
     for path in os.scandir(src):
-        if path.is_file():
-            recurse_directories(
-                src=path.path,
-                dst=os.path.join(dst, path.name),
-                function=function,
-                ignore_regex=ignore_regex,
-            )
-        else:
-            recurse_directories(
-                src=os.path.join(src, path.name),
-                dst=os.path.join(dst, path.name),
-                function=function,
-                ignore_regex=ignore_regex,
-            )
+        yield from walk_directories(
+            src=path.path,
+            dst=os.path.join(dst, path.name),
+            ignore_regex=ignore_regex,
+        )
+
+
+def recurse_directories(
+    src: str,
+    dst: str,
+    function: Callable[[str, str], None],
+    ignore_regex,
+):
+    for src_path, dst_path in walk_directories(src, dst, ignore_regex):
+        function(src_path, dst_path)
@@ -1,6 +1,9 @@
 import abc
 import enum
 import sys
+import threading
+import contextvars
+import collections
 from typing import Any, Optional
 
 from functools import partial
@@ -44,62 +47,101 @@ _LABELS_COLORS = [
 ]
 
 
+# Indentation of the current thread (or task), labels is a tuple
+_State = collections.namedtuple("_State", ["indent", "labels", "silent"])
+
+
 class _Indent:
     def __init__(self, logger_impl, num, label):
         self._num = num
         self._logger = logger_impl
         self._label = label
+        self._token = None
 
     def __enter__(self):
-        self._logger._indent += self._num
+        state = self._logger._state.get()
+        labels = state.labels
 
         if self._label is not None:
-            self._logger._labels.append(self._label)
+            labels += (self._label,)
+
+            if self._logger._span_sink is not None:
+                self._logger._span_sink.begin(self._label)
+
+        self._token = self._logger._state.set(
+            state._replace(indent=state.indent + self._num, labels=labels)
+        )
 
     def __exit__(self, *_):
-        self._logger._indent -= self._num
+        self._logger._state.reset(self._token)
 
-        if self._label is not None:
-            self._logger._labels.pop()
+        if self._label is not None and self._logger._span_sink is not None:
+            self._logger._span_sink.end(self._label)
 
 
 class _Silence:
     def __init__(self, logger_impl):
         self._logger = logger_impl
-        self._enabled_tags = []
+        self._token = None
 
     def __enter__(self):
-        self._enabled_tags = self._logger._enabled_tags
-        self._logger._enabled_tags = []
+        self._token = self._logger._state.set(
+            self._logger._state.get()._replace(silent=True)
+        )
 
     def __exit__(self, *_):
-        self._logger._enabled_tags = self._enabled_tags
+        self._logger._state.reset(self._token)
 
 
 class Logger(abc.ABC):
     def __init__(self, enabled_tags=None, use_colors=True) -> None:
-        self._indent: int = 0
-        self._labels = []
+        # Threads started with contextvars.copy_context().run
+        # continue with the indentation of the thread starting them
+        self._state = contextvars.ContextVar(
+            f"logger_state_{id(self)}", default=_State(0, (), False)
+        )
+        self._preambles = {}
         self._use_colors: bool = use_colors
         self._enabled_tags = enabled_tags or []
+        self._span_sink = None
+
+    def set_span_sink(self, sink) -> None:
+        """
+        Makes every labeled indent() report its begin and end
+        to sink (see dots.util.trace.TraceSink)
+        """
+        self._span_sink = sink
 
     @abc.abstractmethod
     def _log_impl(self, head: str, fmt: str, *args) -> None:
         pass
 
+    @abc.abstractmethod
+    def _write_impl(self, text: str) -> None:
+        pass
+
     def _clr(self, text: str, *args, **kwargs) -> str:
         if not self._use_colors:
             return text
 
         return colors.fmt(text, *args, **kwargs)
 
-    def _preamble(self) -> str:
-        indent = "-" * self._indent
-        labels = self._clr("/", "white").join(
-            self._clr(label, _LABELS_COLORS[index % len(_LABELS_COLORS)])
-            for index, label in enumerate(self._labels)
-        )
-        return f"{indent}[{labels}] "
+    def _preamble(self, state: _State) -> str:
+        key = (state.indent, state.labels)
+        preamble = self._preambles.get(key)
+
+        if preamble is None:
+            indent = "-" * state.indent
+            labels = self._clr("/", "white").join(
+                self._clr(label, _LABELS_COLORS[index % len(_LABELS_COLORS)])
+                for index, label in enumerate(state.labels)
+            )
+            preamble = self._preambles[key] = f"{indent}[{labels}] "
+
+        return preamble
+
+    def _enabled(self, tag: Tags, state: _State) -> bool:
+        return not state.silent and tag in self._enabled_tags
 
     def _newline(self, preamble: str) -> str:
         return "\n     " + preamble
@@ -115,18 +157,53 @@ class Logger(abc.ABC):
             )
         )
 
-    def _build_log_args(self, preamble: str, fmt, *args):
-        return [preamble + self._fmt("| " + " " * self._indent, fmt), *args]
+    def _build_log_args(self, state: _State, fmt, *args):
+        return [
+            self._preamble(state) + self._fmt("| " + " " * state.indent, fmt),
+            *args,
+        ]
 
     def log(self, tag: Tags, fmt, *args):
-        if tag not in self._enabled_tags:
+        state = self._state.get()
+
+        if not self._enabled(tag, state):
             return
 
         self._log_impl(
             self._clr(tag.name, tag.value) + ": ",
-            *self._build_log_args(self._preamble(), fmt, *args),
+            *self._build_log_args(state, fmt, *args),
         )
 
+        if tag == Tags.ERROR:
+            self.flush()
+
+    def stream(self, tag: Tags, chunks) -> None:
+        """
+        Logs text coming in chunks as a single message, chunks are written
+        as they come without being formatted or kept in memory.
+        Chunks are not consumed at all if tag is not enabled
+        """
+        state = self._state.get()
+
+        if not self._enabled(tag, state):
+            return
+
+        self._write_impl(self._clr(tag.name, tag.value) + ": " + self._preamble(state))
+        last = ""
+
+        for chunk in chunks:
+            if chunk:
+                self._write_impl(chunk)
+                last = chunk
+
+        if not last.endswith("\n"):
+            self._write_impl("\n")
+
+    def flush(self) -> None:
+        """
+        Writes out buffered messages
+        """
+
     def info(self, fmt, *args):
         self.log(Tags.INFO, fmt, *args)
 
@@ -144,12 +221,37 @@ class Logger(abc.ABC):
 
 
 class StdErrLogger(Logger):
+    """
+    Buffers messages and writes them to stderr at once when the buffer
+    gets full, on flush() (e.g. after every plugin) and on errors
+    """
+
+    def __init__(self, enabled_tags=None, use_colors=True, buffer_size=64 * 1024):
+        super().__init__(enabled_tags, use_colors)
+        self._buffer = []
+        self._buffered = 0
+        self._buffer_size = buffer_size
+        self._lock = threading.RLock()
+
     def _log_impl(self, head: str, fmt: str, *args) -> None:
-        if head:
-            sys.stderr.write(head)
+        self._write_impl(f"{head}{fmt % args}\n")
+
+    def _write_impl(self, text: str) -> None:
+        with self._lock:
+            self._buffer.append(text)
+            self._buffered += len(text)
+
+            if self._buffered >= self._buffer_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                sys.stderr.write("".join(self._buffer))
+                self._buffer = []
+                self._buffered = 0
 
-        sys.stderr.write(fmt % args)
-        sys.stderr.write("\n")
+            sys.stderr.flush()
 
 
 _GLOBAL_LOGGER = None
@@ -0,0 +1,79 @@
+import json
+
+from dots.util import actions
+from dots.util.logger import logger
+
+PLAN_VERSION = 1
+
+
+class StalePlan(Exception):
+    """
+    Raised when the state of the file system has changed
+    since the plan was made
+    """
+
+
+_recorded = None
+
+
+def start_recording() -> None:
+    global _recorded  # pylint: disable=global-statement
+    _recorded = []
+
+
+def stop_recording():
+    global _recorded  # pylint: disable=global-statement
+    recorded, _recorded = _recorded, None
+    return recorded
+
+
+def record(action: actions.Action) -> None:
+    """
+    Remembers the action along with the current state
+    of its target if a plan is being recorded
+    """
+    if _recorded is None:
+        return
+
+    action.capture_pre_state()
+    _recorded.append(action)
+
+
+def save(path: str, recorded) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "version": PLAN_VERSION,
+                "actions": [action.to_dict() for action in recorded],
+            },
+            file,
+            indent=2,
+        )
+
+
+def load(path: str):
+    with open(path, "r", encoding="utf-8") as file:
+        obj = json.load(file)
+
+    assert (
+        obj.get("version") == PLAN_VERSION
+    ), f"Unsupported plan version {obj.get('version')}"
+
+    return [actions.from_dict(action) for action in obj["actions"]]
+
+
+def verify(loaded) -> None:
+    """
+    Raises StalePlan if any of the actions cannot be performed
+    because its target (or source) has changed since the plan was made
+    """
+    reasons = [reason for action in loaded for reason in action.stale_reasons()]
+
+    if not reasons:
+        return
+
+    logger().error(
+        ["Plan is stale, nothing done:"] + ["%s"] * len(reasons),
+        *reasons,
+    )
+    raise StalePlan(f"{len(reasons)} path(s) changed since the plan was made")
@@ -0,0 +1,234 @@
+import sys
+import json
+import time
+
+
+class _NoPhase:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *_):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class _Phase:
+    def __init__(self, profiler_impl, name: str) -> None:
+        self._profiler = profiler_impl
+        self._name = name
+        self._wall = 0.0
+        self._cpu = 0.0
+
+    def __enter__(self):
+        self._profiler._enter(self._name)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def __exit__(self, *_):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self._profiler._exit(self._name)
+        self._profiler.record(self._name, wall, cpu)
+
+
+class CProfileProbe:
+    """
+    Runs cProfile during top-level phases
+    """
+
+    name = "cprofile"
+
+    def __init__(self) -> None:
+        import cProfile
+
+        self._profile = cProfile.Profile()
+
+    def start(self, _: str) -> None:
+        self._profile.enable()
+
+    def stop(self, _: str) -> None:
+        self._profile.disable()
+
+    def records(self):
+        return None
+
+    def dump(self, path: str) -> None:
+        self._profile.dump_stats(path)
+
+
+class MemoryProbe:
+    """
+    Measures peak and retained memory (tracemalloc) of top-level phases
+    """
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        import tracemalloc
+
+        self._tracemalloc = tracemalloc
+        self._tracemalloc.start()
+        self._records = {}
+        self._current = 0
+
+    def start(self, _: str) -> None:
+        self._tracemalloc.reset_peak()
+        self._current = self._tracemalloc.get_traced_memory()[0]
+
+    def stop(self, name: str) -> None:
+        current, peak = self._tracemalloc.get_traced_memory()
+        calls, max_peak, retained = self._records.get(name, (0, 0, 0))
+        self._records[name] = (
+            calls + 1,
+            max(max_peak, peak - self._current),
+            retained + current - self._current,
+        )
+
+    def records(self):
+        """
+        Returns phases sorted by peak memory, most expensive first
+        """
+        return sorted(
+            (
+                {
+                    "phase": name,
+                    "calls": calls,
+                    "peak": peak,
+                    "retained": retained,
+                }
+                for name, (calls, peak, retained) in self._records.items()
+            ),
+            key=lambda record: record["peak"],
+            reverse=True,
+        )
+
+    def report_lines(self):
+        records = self.records()
+        width = max([len("phase")] + [len(record["phase"]) for record in records])
+        lines = [
+            f"{'phase':<{width}} {'calls':>7} {'peak KiB':>12} {'retained KiB':>12}"
+        ]
+
+        for record in records:
+            lines.append(
+                f"{record['phase']:<{width}} {record['calls']:>7} "
+                f"{record['peak'] / 1024:>12.1f} {record['retained'] / 1024:>12.1f}"
+            )
+
+        return lines
+
+
+class Profiler:
+    """
+    Accumulates wall and CPU time spent in named phases
+    """
+
+    def __init__(self, enabled: bool = False, probes=None) -> None:
+        self.enabled = enabled
+        self.probes = probes or []
+        self._records = {}
+        self._depth = 0
+        self._started = time.perf_counter()
+
+    def _enter(self, name: str) -> None:
+        # Probes (cProfile, tracemalloc) cannot be nested,
+        # they only run during the outermost phases
+        if self._depth == 0:
+            for probe in self.probes:
+                probe.start(name)
+
+        self._depth += 1
+
+    def _exit(self, name: str) -> None:
+        self._depth -= 1
+
+        if self._depth == 0:
+            for probe in self.probes:
+                probe.stop(name)
+
+    def probe(self, name: str):
+        for probe in self.probes:
+            if probe.name == name:
+                return probe
+
+        return None
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NO_PHASE
+
+        return _Phase(self, name)
+
+    def record(self, name: str, wall: float, cpu: float) -> None:
+        calls, total_wall, total_cpu = self._records.get(name, (0, 0.0, 0.0))
+        self._records[name] = (calls + 1, total_wall + wall, total_cpu + cpu)
+
+    def records(self):
+        """
+        Returns recorded phases sorted by wall time, most expensive first
+        """
+        return sorted(
+            (
+                {
+                    "phase": name,
+                    "calls": calls,
+                    "wall": wall,
+                    "cpu": cpu,
+                }
+                for name, (calls, wall, cpu) in self._records.items()
+            ),
+            key=lambda record: record["wall"],
+            reverse=True,
+        )
+
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def report_lines(self):
+        records = self.records()
+        width = max([len("phase")] + [len(record["phase"]) for record in records])
+        lines = [f"{'phase':<{width}} {'calls':>7} {'wall ms':>10} {'cpu ms':>10}"]
+
+        for record in records:
+            lines.append(
+                f"{record['phase']:<{width}} {record['calls']:>7} "
+                f"{record['wall'] * 1000:>10.2f} {record['cpu'] * 1000:>10.2f}"
+            )
+
+        lines.append(f"{'total':<{width}} {'':>7} {self.total() * 1000:>10.2f}")
+        return lines
+
+    def report(self, out=None) -> None:
+        out = out or sys.stderr
+        out.write("\n".join(self.report_lines()) + "\n")
+
+    def dump_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "total": self.total(),
+                    "phases": self.records(),
+                    **{
+                        probe.name: probe.records()
+                        for probe in self.probes
+                        if probe.records() is not None
+                    },
+                },
+                file,
+                indent=2,
+            )
+
+
+_GLOBAL_PROFILER = Profiler()
+
+
+def override_profiler(profiler_instance: Profiler) -> None:
+    global _GLOBAL_PROFILER  # pylint: disable=global-variable-not-assigned,global-statement
+    _GLOBAL_PROFILER = profiler_instance
+
+
+def profiler() -> Profiler:
+    global _GLOBAL_PROFILER  # pylint: disable=global-variable-not-assigned,global-statement
+    return _GLOBAL_PROFILER
@@ -0,0 +1,55 @@
+import os
+import json
+import time
+import threading
+
+
+class TraceSink:
+    """
+    Records spans (labeled logger indents) as Chrome trace events,
+    which can be opened in Perfetto or chrome://tracing
+    """
+
+    def __init__(self) -> None:
+        self._pid = os.getpid()
+        self._events = []
+
+    def _event(self, phase: str, label: str) -> None:
+        # list.append() is atomic, no lock is needed
+        self._events.append(
+            {
+                "name": label,
+                "ph": phase,
+                "ts": time.perf_counter_ns() / 1000,
+                "pid": self._pid,
+                "tid": threading.get_native_id(),
+            }
+        )
+
+    def begin(self, label: str) -> None:
+        self._event("B", label)
+
+    def end(self, label: str) -> None:
+        self._event("E", label)
+
+    def events(self):
+        return list(self._events)
+
+    def write(self, path: str) -> None:
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self._pid,
+                "args": {"name": "dots"},
+            }
+        ]
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "traceEvents": metadata + self.events(),
+                    "displayTimeUnit": "ms",
+                },
+                file,
+            )
@@ -0,0 +1,276 @@
+import os
+import abc
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+from typing import Optional
+
+from dots.util.logger import logger
+
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0x00000800
+_IN_CLOEXEC = 0x00080000
+
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _walk_directories(root: str):
+    if not os.path.isdir(root):
+        return
+
+    yield root
+
+    for path, dirs, _ in os.walk(root):
+        for name in dirs:
+            yield os.path.join(path, name)
+
+
+def _walk_files(root: str):
+    if os.path.isfile(root):
+        yield root
+        return
+
+    for path, _, files in os.walk(root):
+        for name in files:
+            yield os.path.join(path, name)
+
+
+class Watcher(abc.ABC):
+    """
+    Reports changes of a set of files and directory trees
+    """
+
+    def __init__(self) -> None:
+        self._files = set()
+        self._trees = set()
+
+    def set_paths(self, files, trees) -> None:
+        self._files = {os.path.abspath(path) for path in files}
+        self._trees = {os.path.abspath(path) for path in trees}
+        self._on_paths_changed()
+
+    def is_watched(self, path: str) -> bool:
+        return path in self._files or any(
+            path == tree or path.startswith(tree + os.sep) for tree in self._trees
+        )
+
+    @abc.abstractmethod
+    def _on_paths_changed(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def wait(self, timeout: Optional[float] = None):
+        """
+        Waits for changes for at most timeout seconds (forever if None)
+        and returns a set of changed paths (empty on timeout)
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class PollingWatcher(Watcher):
+    def __init__(self, interval: float = 0.5) -> None:
+        super().__init__()
+        self._interval = interval
+        self._snapshot = {}
+
+    def _take_snapshot(self):
+        snapshot = {}
+
+        for root in self._files | self._trees:
+            for path in _walk_files(root):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size, stat.st_mode)
+
+        for path in self._files:
+            snapshot.setdefault(path, None)
+
+        return snapshot
+
+    def _on_paths_changed(self) -> None:
+        self._snapshot = self._take_snapshot()
+
+    def wait(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            snapshot = self._take_snapshot()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+
+            if changed:
+                return changed
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+
+            time.sleep(
+                self._interval
+                if deadline is None
+                else max(0, min(self._interval, deadline - time.monotonic()))
+            )
+
+
+class InotifyWatcher(Watcher):
+    """
+    Uses linux inotify(7) through libc. Directories are watched
+    instead of files, so that files replaced by editors are noticed too
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1() failed")
+
+        self._wd_to_dir = {}
+        self._dir_to_wd = {}
+
+    def _add_watch(self, directory: str) -> None:
+        if directory in self._dir_to_wd or not os.path.isdir(directory):
+            return
+
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), ctypes.c_uint32(_WATCH_MASK)
+        )
+
+        if wd < 0:
+            logger().warning(
+                [
+                    "Failed to watch directory",
+                    "path\t= %s",
+                    "errno\t= %s",
+                ],
+                directory,
+                ctypes.get_errno(),
+            )
+            return
+
+        self._wd_to_dir[wd] = directory
+        self._dir_to_wd[directory] = wd
+
+    def _on_paths_changed(self) -> None:
+        for wd in self._wd_to_dir:
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+        self._wd_to_dir = {}
+        self._dir_to_wd = {}
+
+        for path in self._files:
+            self._add_watch(os.path.dirname(path))
+
+        for tree in self._trees:
+            if os.path.isdir(tree):
+                for directory in _walk_directories(tree):
+                    self._add_watch(directory)
+            else:
+                self._add_watch(os.path.dirname(tree))
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            end = offset + length
+            name = os.fsdecode(data[offset:end].rstrip(b"\0"))
+            offset = end
+
+            directory = self._wd_to_dir.get(wd)
+            if directory is None:
+                continue
+
+            path = os.path.join(directory, name) if name else directory
+
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                if self.is_watched(path):
+                    for subdirectory in _walk_directories(path):
+                        self._add_watch(subdirectory)
+
+            if self.is_watched(path):
+                changed.add(path)
+
+        return changed
+
+    def wait(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+
+            if remaining is not None and remaining <= 0:
+                return set()
+
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+
+            if not readable:
+                return set()
+
+            changed = self._read_events()
+
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def create_watcher(poll: bool = False, interval: float = 0.5) -> Watcher:
+    """
+    Creates inotify-based watcher where possible, polling one otherwise
+    """
+
+    if not poll:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError) as error:
+            logger().warning(
+                [
+                    "inotify is not available, falling back to polling",
+                    "error\t= %s",
+                ],
+                error,
+            )
+
+    return PollingWatcher(interval)
@@ -0,0 +1,155 @@
+import os
+
+from dots import dottools
+from dots.yaml import loader
+from dots.util import fs, watcher as watchers
+from dots.util.executor import executor
+from dots.util.logger import logger
+
+
+def _depends_on(plug, changed) -> bool:
+    for input_path in plug.inputs():
+        input_path = os.path.abspath(input_path)
+
+        for path in changed:
+            if path == input_path or path.startswith(input_path + os.sep):
+                return True
+
+    return False
+
+
+def _watched_paths(config_path, plugins):
+    files = {config_path} | loader.included_files()
+    trees = set()
+
+    for _, plug in plugins:
+        for path in plug.inputs():
+            if os.path.isdir(path):
+                trees.add(path)
+            else:
+                files.add(path)
+
+    return files, trees
+
+
+def _collect_changes(watcher, debounce: float):
+    # Block until something changes, then coalesce
+    # everything that follows within the debounce interval
+    changed = watcher.wait()
+
+    while True:
+        more = watcher.wait(debounce)
+
+        if not more:
+            return changed
+
+        changed |= more
+
+
+def _configs_of(plugins):
+    return {name: plug.config.to_dict() for name, plug in plugins}
+
+
+def _affected_plugins(plugins, old_configs, changed):
+    affected = []
+
+    for name, plug in plugins:
+        if old_configs.get(name) != plug.config.to_dict():
+            affected.append((name, plug))
+        elif _depends_on(plug, changed):
+            affected.append((name, plug))
+
+    return affected
+
+
+def _apply(plugins) -> None:
+    try:
+        with executor().batch():
+            for name, plug in plugins:
+                try:
+                    dottools.run_plugin(name, plug, "apply")
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    logger().error(
+                        [
+                            "Failed to apply plugin",
+                            "plugin\t= %s",
+                            "error\t= %s",
+                        ],
+                        name,
+                        error,
+                    )
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        logger().error(
+            [
+                "Failed to perform actions",
+                "error\t= %s",
+            ],
+            error,
+        )
+
+    # Nothing else is logged until the next change
+    logger().flush()
+
+
+def _reload(config_path, field, parse_jobs, changed_yaml):
+    loader.invalidate_included_files(changed_yaml)
+    _, cfg = dottools.load_config(config_path, parse_jobs)
+    return dottools.create_plugins(cfg, field)
+
+
+def watch(
+    config_path,
+    field,
+    parse_jobs=1,
+    debounce=0.2,
+    poll=False,
+    poll_interval=0.5,
+):
+    """
+    Applies the configuration, then watches all of its inputs
+    and re-applies only the plugins affected by changes
+    """
+
+    loader.retain_included_files(True)
+    _, cfg = dottools.load_config(config_path, parse_jobs)
+    plugins = dottools.create_plugins(cfg, field)
+    _apply(plugins)
+
+    watcher = watchers.create_watcher(poll=poll, interval=poll_interval)
+    watcher.set_paths(*_watched_paths(config_path, plugins))
+
+    try:
+        while True:
+            changed = _collect_changes(watcher, debounce)
+            fs.reset_stat_cache()
+            changed_yaml = changed & ({config_path} | loader.included_files())
+
+            logger().info(
+                [
+                    "Detected changes",
+                    "paths\t= %s",
+                ],
+                ", ".join(sorted(changed)),
+            )
+
+            old_configs = _configs_of(plugins)
+
+            if changed_yaml:
+                try:
+                    plugins = _reload(config_path, field, parse_jobs, changed_yaml)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    logger().error(
+                        [
+                            "Failed to reload configuration, keeping the previous one",
+                            "error\t= %s",
+                        ],
+                        error,
+                    )
+                    continue
+
+            _apply(_affected_plugins(plugins, old_configs, changed))
+            watcher.set_paths(*_watched_paths(config_path, plugins))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
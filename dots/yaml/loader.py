@@ -1,32 +1,142 @@
 import os
-from functools import partial
+import copy
+from functools import lru_cache, partial
 
 import yaml
 
 from dots.util.logger import logger
+from dots.util.profiler import profiler
 from dots.yaml.enrich import enrich_obj
 
 
+INCLUDE_TAG = "!include"
+
+_YAML_EXTENSIONS = (".yml", ".yaml")
+_WILDCARD_CHARS = "*?[]!"
+
+
+class _IncludeConstructor:
+    """
+    Wraps yamlinclude's constructor with a cache of already parsed
+    files, so that a file parsed elsewhere (e.g. in a worker process)
+    is not parsed again when the !include tag is constructed
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.cache = {}
+        self.retain = False
+        self.included_by = {}
+        self._delegate_instance = None
+
+    def _delegate(self, loader, node):
+        if self._delegate_instance is None:
+            # Imported on the first !include met, configs without
+            # includes do not pay for it
+            from yamlinclude import YamlIncludeConstructor
+
+            self._delegate_instance = YamlIncludeConstructor(base_dir=self.base_dir)
+
+        return self._delegate_instance(loader, node)
+
+    def reset_delegate(self) -> None:
+        self._delegate_instance = None
+
+    def __call__(self, loader, node):
+        path = include_path(node, self.base_dir)
+
+        if path is None:
+            return self._delegate(loader, node)
+
+        self.included_by.setdefault(path, set()).add(os.path.abspath(loader.name))
+
+        if path not in self.cache:
+            obj = self._delegate(loader, node)
+
+            if not self.retain:
+                return obj
+
+            self.cache[path] = copy.deepcopy(obj)
+
+        # Included objects are mutated by enrich_obj(),
+        # each inclusion must get its own copy
+        return copy.deepcopy(self.cache[path])
+
+    def invalidate(self, paths) -> None:
+        queue = list(paths)
+
+        while queue:
+            path = queue.pop()
+            self.cache.pop(path, None)
+            queue.extend(self.included_by.pop(path, set()))
+
+
+_include_constructor = None
+_env_vars_read = set()
+
+
 def _env_tag_handler(_, node):
+    _env_vars_read.add(node.value)
     return os.environ.get(node.value) or ""
 
 
+# Results of !eval-pure expressions by their source, kept during a run
+_pure_results = {}
+
+
+@lru_cache(maxsize=None)
+def _compile_expression(source: str):
+    return compile(source, "<!eval>", "eval")
+
+
+def _evaluate(node, eval_locals):
+    with profiler().phase(f"eval:{node.value}"):
+        try:
+            return eval(  # pylint: disable=eval-used
+                _compile_expression(node.value), {}, eval_locals
+            )
+        except Exception as error:
+            logger().error(
+                [
+                    f"Failed to evaluate {node.tag} tag",
+                    "value\t= %s",
+                    "error\t= %s",
+                    "local\t= %s",
+                ],
+                node.value,
+                error,
+                str(eval_locals),
+            )
+            raise
+
+
 def _eval_tag_handler(_, node, eval_locals):
-    try:
-        return eval(node.value, {}, eval_locals)  # pylint: disable=eval-used
-    except Exception as error:
-        logger().error(
-            [
-                "Failed to evaluate !eval tag",
-                "value\t= %s",
-                "error\t= %s",
-                "local\t= %s",
-            ],
-            node.value,
-            error,
-            str(locals),
-        )
-        raise
+    return _evaluate(node, eval_locals)
+
+
+def _eval_pure_tag_handler(_, node, eval_locals):
+    """
+    Same as !eval for expressions depending only on their text,
+    each of them is evaluated once per run
+    """
+    if node.value not in _pure_results:
+        _pure_results[node.value] = _evaluate(node, eval_locals)
+
+    # Constructed objects are mutated by enrich_obj(),
+    # each node must get its own copy
+    return copy.deepcopy(_pure_results[node.value])
+
+
+def set_include_base_dir(base_dir: str) -> None:
+    """
+    Makes !include paths relative to base_dir,
+    parsed files are cached by their absolute paths
+    """
+    if _include_constructor is None or _include_constructor.base_dir == base_dir:
+        return
+
+    _include_constructor.base_dir = base_dir
+    _include_constructor.reset_delegate()
 
 
 def add_yaml_constructor(tag, handler):
@@ -34,16 +144,259 @@ def add_yaml_constructor(tag, handler):
 
 
 def add_common_yaml_constructors(include_base_dir, eval_locals):
-    from yamlinclude import YamlIncludeConstructor
+    global _include_constructor  # pylint: disable=global-statement
 
-    YamlIncludeConstructor.add_to_loader_class(
-        loader_class=yaml.SafeLoader,
-        base_dir=include_base_dir,
-    )
+    _include_constructor = _IncludeConstructor(include_base_dir)
+    add_yaml_constructor(INCLUDE_TAG, _include_constructor)
     add_yaml_constructor("!env", _env_tag_handler)
     add_yaml_constructor("!eval", partial(_eval_tag_handler, eval_locals=eval_locals))
+    add_yaml_constructor(
+        "!eval-pure", partial(_eval_pure_tag_handler, eval_locals=eval_locals)
+    )
+    _pure_results.clear()
+
+
+def retain_included_files(retain: bool) -> None:
+    """
+    Keeps parsed included files between calls of load_rich_yaml_from(),
+    so that only invalidated ones are parsed again
+    """
+    if _include_constructor is not None:
+        _include_constructor.retain = retain
+
+
+def invalidate_included_files(paths) -> None:
+    """
+    Drops retained included files at paths and all files including them
+    """
+    if _include_constructor is not None:
+        _include_constructor.invalidate(os.path.abspath(path) for path in paths)
+
+
+def included_files():
+    """
+    Returns paths of yaml files included during loads so far
+    """
+    if _include_constructor is None:
+        return set()
+
+    return set(_include_constructor.included_by.keys())
+
+
+def env_vars_read():
+    """
+    Returns names of environment variables read by !env tags so far
+    """
+    return set(_env_vars_read)
+
+
+def include_path(node, base_dir):
+    """
+    Returns absolute path of a yaml file included by the !include node,
+    or None if the node includes anything else (wildcards, other readers etc)
+    """
+
+    if isinstance(node, yaml.ScalarNode):
+        pathname = node.value
+    elif isinstance(node, yaml.MappingNode):
+        args = {key.value: value.value for key, value in node.value}
+
+        if set(args.keys()) - {"pathname", "encoding"}:
+            return None
+
+        if args.get("encoding", "utf-8").lower() not in {"utf-8", "utf8"}:
+            return None
+
+        pathname = args.get("pathname")
+    else:
+        return None
 
+    if not isinstance(pathname, str) or any(c in pathname for c in _WILDCARD_CHARS):
+        return None
 
-def load_rich_yaml_from(path: str):
+    if not pathname.endswith(_YAML_EXTENSIONS):
+        return None
+
+    return os.path.abspath(os.path.join(base_dir, pathname))
+
+
+def _find_tagged_nodes(node, tags, found, visited):
+    if id(node) in visited:
+        return
+
+    visited.add(id(node))
+
+    if node.tag in tags:
+        found.append(node)
+        return
+
+    if isinstance(node, yaml.SequenceNode):
+        for item in node.value:
+            _find_tagged_nodes(item, tags, found, visited)
+
+    if isinstance(node, yaml.MappingNode):
+        for key, value in node.value:
+            _find_tagged_nodes(key, tags, found, visited)
+            _find_tagged_nodes(value, tags, found, visited)
+
+
+def _compose_tagged_nodes(path: str, tags):
+    with open(path, "r", encoding="utf-8") as file:
+        root = yaml.compose(file, Loader=yaml.SafeLoader)
+
+    if root is None:
+        return []
+
+    nodes = []
+    _find_tagged_nodes(root, tags, nodes, set())
+    return nodes
+
+
+def tags_used(path: str, tags):
+    """
+    Returns which of tags are used in the file at path (not in files
+    it includes). The file is only composed, no tags are constructed
+    """
+    return {node.tag for node in _compose_tagged_nodes(path, tags)}
+
+
+def find_includes(path: str, base_dir: str):
+    """
+    Returns paths of yaml files directly included by the file at path.
+    The file is only composed, no tags are constructed
+    """
+
+    nodes = _compose_tagged_nodes(path, {INCLUDE_TAG})
+
+    paths = (include_path(node, base_dir) for node in nodes)
+    return list(dict.fromkeys(path for path in paths if path is not None))
+
+
+def include_graph(path: str, base_dir: str):
+    """
+    Returns a dictionary {file: [included files]} of all yaml files
+    reachable from path via !include tags (path itself included)
+    """
+
+    graph = {}
+    queue = [os.path.abspath(path)]
+
+    while queue:
+        current = queue.pop()
+
+        if current in graph:
+            continue
+
+        graph[current] = (
+            find_includes(current, base_dir) if os.path.isfile(current) else []
+        )
+        queue.extend(graph[current])
+
+    return graph
+
+
+def _parse_yaml_file(path: str):
     with open(path, "r", encoding="utf-8") as file:
-        return enrich_obj(yaml.safe_load(file))
+        return yaml.safe_load(file)
+
+
+def _parse_in_worker(path: str):
+    """
+    Returns the parsed file along with names of environment variables
+    read by its !env tags, those are recorded in the worker process only
+    """
+    read_before = set(_env_vars_read)
+    return _parse_yaml_file(path), _env_vars_read - read_before
+
+
+def _parse_in_pool(paths, jobs: int):
+    import multiprocessing
+    from concurrent import futures
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        # Workers must inherit yaml constructors registered in this process
+        return {}
+
+    parsed = {}
+
+    # Forked workers must not inherit (and write again) buffered messages
+    logger().flush()
+    pool = futures.ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+    )
+
+    with pool:
+        submitted = {pool.submit(_parse_in_worker, path): path for path in paths}
+
+        for future in futures.as_completed(submitted):
+            path = submitted[future]
+
+            try:
+                parsed[path], env_vars = future.result()
+                _env_vars_read.update(env_vars)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                # Leave it to the serial parser, so it fails the same way
+                logger().warning(
+                    [
+                        "Failed to parse included file in worker process",
+                        "path\t= %s",
+                        "error\t= %s",
+                    ],
+                    path,
+                    error,
+                )
+
+    return parsed
+
+
+def _preload_includes(path: str, jobs: int) -> None:
+    if _include_constructor is None:
+        return
+
+    graph = include_graph(path, _include_constructor.base_dir)
+    root = os.path.abspath(path)
+    leaves = [
+        file
+        for file, includes in graph.items()
+        if file != root and not includes
+        # Retained files are parsed again only once invalidated
+        and file not in _include_constructor.cache and os.path.isfile(file)
+    ]
+
+    logger().info(
+        [
+            "Parsing included files in parallel",
+            "files\t= %s",
+            "leaves\t= %s",
+            "jobs\t= %s",
+        ],
+        len(graph),
+        len(leaves),
+        jobs,
+    )
+
+    if len(leaves) > 1:
+        _include_constructor.cache.update(_parse_in_pool(leaves, jobs))
+
+
+def load_rich_yaml_from(path: str, jobs: int = 1):
+    """
+    Loads and enriches the yaml file at path.
+    If jobs > 1, the included files that do not include anything themselves
+    are parsed in a pool of jobs processes first
+    """
+
+    if jobs > 1:
+        with profiler().phase("yaml.preload"):
+            _preload_includes(path, jobs)
+
+    try:
+        with profiler().phase("yaml.parse"):
+            with open(path, "r", encoding="utf-8") as file:
+                obj = yaml.safe_load(file)
+
+        with profiler().phase("yaml.enrich"):
+            return enrich_obj(obj)
+    finally:
+        if _include_constructor is not None and not _include_constructor.retain:
+            _include_constructor.cache.clear()
@@ -0,0 +1,57 @@
+from dots import dottools
+from dots.config import builder
+from tests.tests_common import disable_log, init_context
+
+
+def _create(config):
+    return dict(dottools.create_plugins(builder.create_config(config)))
+
+
+def test_nested_file_is_left_out_of_dir(disable_log, tmp_path):
+    init_context("conf/config.yaml")
+
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    (src / "sub").mkdir(parents=True)
+    (src / "a").write_text("a\n")
+    (src / "sub" / "b").write_text("b\n")
+    dst.mkdir()
+    (tmp_path / "b").write_text("other b\n")
+
+    plugins = _create(
+        {
+            "dir": {"plug.Dir": {"src": str(src), "dst": str(dst)}},
+            "file": {
+                "plug.File": {"src": str(tmp_path / "b"), "dst": str(dst / "sub" / "b")}
+            },
+        }
+    )
+
+    directory = plugins[".dir.plug.Dir"]
+    directory.build()
+    difference = "\n".join(directory.difference())
+
+    assert str(dst / "a") in difference
+    assert str(dst / "sub" / "b") not in difference
+
+
+def test_same_destination_is_left_to_the_latter(disable_log, tmp_path):
+    init_context("conf/config.yaml")
+    (tmp_path / "first").write_text("first\n")
+    (tmp_path / "second").write_text("second\n")
+    dst = str(tmp_path / "dst")
+
+    plugins = _create(
+        {
+            "first": {"plug.File": {"src": str(tmp_path / "first"), "dst": dst}},
+            "second": {"plug.File": {"src": str(tmp_path / "second"), "dst": dst}},
+        }
+    )
+
+    outputs = []
+    for plug in plugins.values():
+        plug.build()
+        assert bool(list(plug.difference())) == bool(plug.outputs())
+        outputs.extend(plug.outputs())
+
+    assert [output.lines for output in outputs] == [["second\n"]]
@@ -0,0 +1,55 @@
+import pytest
+
+from dots import context
+from dots.plugins import plugin
+from dots.util import logger
+
+
+class _CapturingLogger(logger.StdErrLogger):
+    def __init__(self):
+        super().__init__([logger.Tags.DIFF], use_colors=False)
+        self.written = []
+
+    def _write_impl(self, text):
+        self.written.append(text)
+
+
+@pytest.fixture
+def capturing_logger(tmp_path):
+    saved_logger = logger._GLOBAL_LOGGER
+    saved_context = context._GLOBAL_CONTEXT
+    capturing = _CapturingLogger()
+    logger.override_logger(capturing)
+    context.override_context(
+        context.Context(
+            config_path=str(tmp_path / "conf" / "config.yaml"),
+            dottools_root=str(tmp_path),
+            dry_run=True,
+        )
+    )
+
+    try:
+        yield capturing
+    finally:
+        logger.override_logger(saved_logger)
+        context.override_context(saved_context)
+
+
+def test_difference_is_streamed_until_the_limit(capturing_logger):
+    context.context().diff_total_limit = 3
+    computed = []
+
+    def difference():
+        for index in range(100):
+            computed.append(index)
+            yield f"100% line {index}\n"
+
+    plugin.Plugin.log_difference(difference())
+
+    assert capturing_logger.written[1:] == [
+        "100% line 0\n",
+        "100% line 1\n",
+        "100% line 2\n",
+        "... (difference truncated)\n",
+    ]
+    assert len(computed) == 3
@@ -0,0 +1,62 @@
+import sys
+
+from dots.config import builder
+from dots.plugins import plugin
+from tests.tests_common import disable_log
+
+
+class External(plugin.Plugin):
+    pass
+
+
+class _FakeEntryPoint:
+    def __init__(self, loaded):
+        self._loaded = loaded
+
+    def load(self):
+        return self._loaded
+
+
+def _write_plugin_module(path, module_name, class_name):
+    with open(path / f"{module_name}.py", "w", encoding="utf-8") as file:
+        file.write(
+            "from dots.plugins import plugin\n\n\n"
+            f"class {class_name}(plugin.Plugin):\n"
+            "    pass\n"
+        )
+
+
+def test_plugin_module_is_imported_on_demand(disable_log, tmp_path, monkeypatch):
+    _write_plugin_module(tmp_path, "lazy_plugin_module", "Lazy")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = plugin._PluginRegistry(index={"Lazy": "lazy_plugin_module"})
+
+    registry.create_all_plugins(builder.create_config({"key": {"inner": 1}}))
+    assert "lazy_plugin_module" not in sys.modules
+
+    plugins = registry.create_all_plugins(
+        builder.create_config({"key": {"plug.Lazy": {"inner": 1}}})
+    )
+    assert "lazy_plugin_module" in sys.modules
+    assert type(plugins["key"]["plug.Lazy"]).__name__ == "Lazy"
+
+
+def test_plugin_from_entry_point(disable_log, monkeypatch):
+    monkeypatch.setattr(
+        plugin,
+        "_entry_points_index",
+        lambda: {"External": _FakeEntryPoint(External)},
+    )
+    registry = plugin._PluginRegistry(index={})
+
+    plugins = registry.create_all_plugins(
+        builder.create_config(
+            {
+                "a": {"plug.External": {}},
+                "b": {"Plugin": {"type": "plug.External", "config": {}}},
+            }
+        )
+    )
+
+    assert isinstance(plugins["a"]["plug.External"], External)
+    assert isinstance(plugins["b"]["Plugin"], External)
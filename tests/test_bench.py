@@ -0,0 +1,25 @@
+from dots import bench
+
+
+def test_percentile():
+    values = [5, 1, 4, 2, 3]
+
+    assert bench.percentile(values, 50) == 3
+    assert bench.percentile(values, 95) == 5
+    assert bench.percentile(values, 0) == 1
+    assert bench.percentile([7], 95) == 7
+
+
+def test_cold_iteration_is_reported_separately():
+    summary = bench._summary(
+        [
+            {"load": 10.0, "plugin": 5.0},
+            {"load": 1.0, "plugin": 0.5},
+            {"load": 2.0, "plugin": 0.7},
+        ]
+    )
+
+    assert summary == [
+        {"phase": "load", "cold": 10.0, "warm_p50": 1.0, "warm_p95": 2.0},
+        {"phase": "plugin", "cold": 5.0, "warm_p50": 0.5, "warm_p95": 0.7},
+    ]
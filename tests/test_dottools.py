@@ -0,0 +1,78 @@
+from dots import context, dottools
+from dots.config import builder
+from dots.util import profiler
+from tests.tests_common import disable_log
+
+
+def test_plugin_reading_another_ones_destination_sees_it_applied(tmp_path, disable_log):
+    context.override_context(
+        context.Context(
+            config_path=str(tmp_path / "conf" / "config.yaml"),
+            dottools_root=str(tmp_path),
+            dry_run=False,
+        )
+    )
+    (tmp_path / "src").write_text("new\n")
+    (tmp_path / "generated").write_text("old\n")
+
+    plugins = dottools.create_plugins(
+        builder.create_config(
+            {
+                "generate": {
+                    "plug.File": {
+                        "src": str(tmp_path / "src"),
+                        "dst": str(tmp_path / "generated"),
+                    }
+                },
+                "copy": {
+                    "plug.File": {
+                        "src": str(tmp_path / "generated"),
+                        "dst": str(tmp_path / "copied"),
+                    }
+                },
+            }
+        )
+    )
+
+    dottools.run_plugins(plugins, "apply")
+
+    assert (tmp_path / "generated").read_text() == "new\n"
+    assert (tmp_path / "copied").read_text() == "new\n"
+
+
+def test_queueing_and_performing_actions_are_timed_apart(tmp_path, disable_log):
+    context.override_context(
+        context.Context(
+            config_path=str(tmp_path / "conf" / "config.yaml"),
+            dottools_root=str(tmp_path),
+            dry_run=False,
+        )
+    )
+    (tmp_path / "src").write_text("new\n")
+
+    plugins = dottools.create_plugins(
+        builder.create_config(
+            {
+                "file": {
+                    "plug.File": {
+                        "src": str(tmp_path / "src"),
+                        "dst": str(tmp_path / "dst"),
+                    }
+                }
+            }
+        )
+    )
+
+    saved = profiler.profiler()
+    profiler.override_profiler(profiler.Profiler(enabled=True))
+
+    try:
+        dottools.run_plugins(plugins, "apply")
+        calls = {
+            record["phase"]: record["calls"] for record in profiler.profiler().records()
+        }
+    finally:
+        profiler.override_profiler(saved)
+
+    assert calls[".file.plug.File:queue"] == 1
+    assert calls[".file.plug.File:apply"] == 1
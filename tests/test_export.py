@@ -0,0 +1,89 @@
+import os
+import tarfile
+import subprocess
+
+import pytest
+
+from dots import context, export
+from dots.yaml import loader
+from tests.tests_common import disable_log
+
+
+def test_manifest_paths_are_relative_to_home():
+    assert export.manifest_path("/home/me/.bashrc", "/home/me") == "~/.bashrc"
+    assert export.manifest_path("/home/me", "/home/me") == "~"
+    assert export.manifest_path("/home/meow/x", "/home/me") == "/home/meow/x"
+    assert export.manifest_path("/etc/motd", "/home/me") == "/etc/motd"
+
+
+def test_bundle_is_applied_once(monkeypatch, disable_log, tmp_path):
+    home = tmp_path / "home"
+    (tmp_path / "conf").mkdir()
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a").write_text("a\n")
+    (tmp_path / "rc").write_text("rc\n")
+    config_path = tmp_path / "conf" / "config.yaml"
+    config_path.write_text(
+        f"rc:\n  plug.File:\n    src: {tmp_path / 'rc'}\n    dst: {home / '.rc'}\n"
+        f"dir:\n  plug.Dir:\n    src: {tmp_path / 'src'}\n    dst: {home / 'dir'}\n"
+    )
+
+    # Lines are written into an existing destination keeping its mode
+    home.mkdir()
+    (home / ".rc").write_text("old\n")
+    os.chmod(home / ".rc", 0o755)
+
+    monkeypatch.setenv("HOME", str(home))
+    context.override_context(
+        context.Context(
+            config_path=str(config_path), dottools_root=str(tmp_path), dry_run=True
+        )
+    )
+    loader.add_common_yaml_constructors(str(tmp_path), {})
+    export.export(str(config_path), ".*", str(tmp_path / "bundle.tar"))
+
+    bundle = tmp_path / "bundle"
+    with tarfile.open(tmp_path / "bundle.tar") as archive:
+        archive.extractall(bundle, filter="data")
+
+    target = tmp_path / "target"
+
+    def apply():
+        return subprocess.run(
+            ["sh", export.APPLIER_NAME],
+            cwd=bundle,
+            env={**os.environ, "DOTS_HOME": str(target)},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    assert sorted(apply().splitlines()) == [
+        f"write {target / '.rc'}",
+        f"write {target / 'dir' / 'a'}",
+    ]
+    assert (target / ".rc").read_text() == "rc\n"
+    assert os.stat(target / ".rc").st_mode & 0o777 == 0o755
+    assert (target / "dir" / "a").read_text() == "a\n"
+    assert apply() == ""
+
+
+def test_links_are_not_exported(monkeypatch, disable_log, tmp_path):
+    (tmp_path / "conf").mkdir()
+    (tmp_path / "src").mkdir()
+    config_path = tmp_path / "conf" / "config.yaml"
+    config_path.write_text(
+        f"dir:\n  plug.Dir:\n    src: {tmp_path / 'src'}\n"
+        f"    dst: {tmp_path / 'home' / 'dir'}\n    softlink: true\n"
+    )
+
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    context.override_context(
+        context.Context(
+            config_path=str(config_path), dottools_root=str(tmp_path), dry_run=True
+        )
+    )
+    loader.add_common_yaml_constructors(str(tmp_path), {})
+
+    with pytest.raises(AssertionError, match="Symbolic links cannot be exported"):
+        export.export(str(config_path), ".*", str(tmp_path / "bundle.tar"))
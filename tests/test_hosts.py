@@ -0,0 +1,90 @@
+import os
+
+from dots import context, dottools, hosts
+from dots.yaml import loader
+from tests.tests_common import disable_log
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def test_hosts_share_files_without_host_dependent_tags(disable_log, tmp_path):
+    root = str(tmp_path)
+    config = os.path.join(root, "conf", "root.yaml")
+    _write(
+        config,
+        "shared: !include frag/shared.yaml\n"
+        "file:\n"
+        "  plug.File:\n"
+        "    src: !include frag/host.yaml\n"
+        f"    dst: {root}/home/rc\n",
+    )
+    _write(os.path.join(root, "frag", "shared.yaml"), "k: v\n")
+    _write(os.path.join(root, "frag", "host.yaml"), "!env SRC\n")
+    _write(os.path.join(root, "a.txt"), "a\n")
+    _write(os.path.join(root, "b.txt"), "b\n")
+    _write(
+        os.path.join(root, "hosts.txt"),
+        f"# hosts\nfirst SRC={root}/a.txt\nsecond conf/root.yaml SRC={root}/b.txt "
+        "ctx.home=/home/second\n",
+    )
+
+    context.override_context(
+        context.Context(config_path=config, dottools_root=root, dry_run=True)
+    )
+    loader.add_common_yaml_constructors(root, {})
+
+    parsed = hosts.parse_hosts_file(os.path.join(root, "hosts.txt"), config)
+    assert [host.name for host in parsed] == ["first", "second"]
+    assert parsed[1].config_path == config
+    assert parsed[1].ctx == {"home": "/home/second"}
+    assert hosts._host_dependent_files(parsed) == {  # pylint: disable=protected-access
+        os.path.join(root, "frag", "host.yaml")
+    }
+
+    out = os.path.join(root, "out")
+    hosts.compile_hosts(config, ".*", os.path.join(root, "hosts.txt"), out)
+
+    for name, content in [("first", "a\n"), ("second", "b\n")]:
+        with open(os.path.join(out, name, root.lstrip(os.sep), "home", "rc")) as file:
+            assert file.read() == content
+
+
+def test_host_config_resolves_paths_against_its_own_directory(disable_log, tmp_path):
+    root = str(tmp_path)
+    config = os.path.join(root, "main", "conf", "root.yaml")
+    other = os.path.join(root, "other", "conf", "root.yaml")
+
+    for base in ["main", "other"]:
+        _write(
+            os.path.join(root, base, "conf", "root.yaml"),
+            "file:\n"
+            "  plug.File:\n"
+            "    src: !rel src.txt\n"
+            "    dst: !include frag/dst.yaml\n",
+        )
+        _write(os.path.join(root, base, "frag", "dst.yaml"), f"{root}/{base}.rc\n")
+        _write(os.path.join(root, base, "src.txt"), f"{base}\n")
+
+    _write(os.path.join(root, "hosts.txt"), "main\nother other/conf/root.yaml\n")
+
+    context.override_context(
+        context.Context(config_path=config, dottools_root=root, dry_run=True)
+    )
+    dottools._setup_yaml_constructors(  # pylint: disable=protected-access
+        os.path.join(root, "main"), {}
+    )
+
+    out = os.path.join(root, "out")
+    hosts.compile_hosts(config, ".*", os.path.join(root, "hosts.txt"), out)
+
+    for name in ["main", "other"]:
+        path = os.path.join(out, name, root.lstrip(os.sep), f"{name}.rc")
+        with open(path, encoding="utf-8") as file:
+            assert file.read() == f"{name}\n"
+
+    assert context.context().cfg_path == config
@@ -0,0 +1,69 @@
+import os
+import re
+import sys
+import subprocess
+
+# Budgets on the sum of self import times reported by `python -X importtime`,
+# interpreter startup included. These are generous on purpose: the point
+# is to catch a heavy module sneaking into the startup path
+HELP_BUDGET_US = 150_000
+DUMP_BUDGET_US = 300_000
+
+HEAVY_MODULES = {
+    "jinja2",
+    "yamlinclude",
+    "difflib",
+    "multiprocessing",
+    "pydoc",
+    "dots.plugins",
+}
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|( *)(\S+)$")
+
+
+def _import_times(*args):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "dots", *args],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+
+        if match:
+            times[match.group(3)] = int(match.group(1))
+
+    return times
+
+
+def _assert_no_heavy_modules(times):
+    imported = {module.split(".")[0] for module in times} | set(times)
+    assert (
+        not HEAVY_MODULES & imported
+    ), f"Heavy modules imported: {HEAVY_MODULES & imported}"
+
+
+def test_help_import_time():
+    times = _import_times("--help")
+
+    _assert_no_heavy_modules(times)
+    assert "yaml" not in times
+    assert "dots.dottools" not in times
+    assert sum(times.values()) < HELP_BUDGET_US
+
+
+def test_dump_import_time(tmp_path):
+    config = os.path.join(str(tmp_path), "conf", "config.yaml")
+    os.makedirs(os.path.dirname(config))
+
+    with open(config, "w", encoding="utf-8") as file:
+        file.write("key: value\nlist: [1, 2, 3]\n")
+
+    times = _import_times("--config-file", config, "dump")
+
+    _assert_no_heavy_modules(times)
+    assert sum(times.values()) < DUMP_BUDGET_US
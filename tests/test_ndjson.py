@@ -0,0 +1,62 @@
+import io
+import json
+
+from dots import ndjson
+from dots.plugins import plugin
+from dots.util import actions, fs, plan
+
+
+class _Plugin:
+    def __init__(self, path) -> None:
+        self._path = path
+
+    def build(self):
+        pass
+
+    def difference(self):
+        yield "Directories differ:\n"
+        yield plugin.file_difference_header(self._path)
+        yield "-old\n+new\n"
+        yield plugin.file_removal_line("/removed")
+
+    def apply(self):
+        fs.write_lines(["new\n"], self._path)
+
+
+def test_change_record_describes_old_and_new_content(tmp_path):
+    path = tmp_path / "file"
+    path.write_text("old 100%\n")
+
+    record = ndjson.change_record(
+        "plugin",
+        actions.WriteFile(str(path), ["new\n"]),
+        differences={str(path): "-old 100%\n+new\n"},
+    )
+
+    assert record == {
+        "type": "change",
+        "plugin": "plugin",
+        "kind": "write",
+        "path": str(path),
+        "old_hash": actions.hash_content("old 100%\n"),
+        "old_size": 9,
+        "new_hash": actions.hash_content("new\n"),
+        "new_size": 4,
+        "diff": "-old 100%\n+new\n",
+    }
+
+
+def test_diff_reuses_plugin_difference_and_plan_is_recorded(tmp_path):
+    path = str(tmp_path / "file")
+    out = io.StringIO()
+
+    ndjson.run_plugins([("p", _Plugin(path))], "diff", ndjson.RecordWriter(out))
+    change = json.loads(out.getvalue().splitlines()[0])
+    assert change["diff"] == "-old\n+new\n"
+
+    plan.start_recording()
+    ndjson.run_plugins(
+        [("p", _Plugin(path))], "plan", ndjson.RecordWriter(io.StringIO())
+    )
+    recorded = plan.stop_recording()
+    assert [(action.kind, action.target) for action in recorded] == [("write", path)]
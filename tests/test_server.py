@@ -0,0 +1,82 @@
+import os
+import time
+import threading
+import socketserver
+
+from dots import client, context, server
+from dots.util import colors, logger
+from dots.yaml import loader
+
+
+def _start_server(monkeypatch, config_path, socket_path):
+    servers = []
+
+    class _Recorded(socketserver.UnixStreamServer):
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, **kwargs)
+            servers.append(self)
+
+    # Signal handlers can only be installed in the main thread
+    monkeypatch.setattr(server.signal, "signal", lambda *_: None)
+    monkeypatch.setattr(server.socketserver, "UnixStreamServer", _Recorded)
+
+    thread = threading.Thread(target=server.serve, args=(config_path, socket_path))
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not servers and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert servers, "Server has not started"
+    return servers[0], thread
+
+
+def test_diff_is_served_over_socket(monkeypatch, capsys, tmp_path):
+    config_path = str(tmp_path / "conf" / "config.yaml")
+    socket_path = str(tmp_path / "dots.sock")
+    os.makedirs(os.path.dirname(config_path))
+    (tmp_path / "src").write_text("new\n")
+    (tmp_path / "dst").write_text("old\n")
+
+    with open(config_path, "w", encoding="utf-8") as file:
+        file.write(
+            f"file:\n  plug.File:\n"
+            f"    src: {tmp_path / 'src'}\n    dst: {tmp_path / 'dst'}\n"
+        )
+
+    saved_logger = logger._GLOBAL_LOGGER
+    logger.override_logger(logger.StdErrLogger())
+    context.override_context(
+        context.Context(
+            config_path=config_path, dottools_root=str(tmp_path), dry_run=True
+        )
+    )
+    loader.add_common_yaml_constructors(str(tmp_path), {})
+    unix_server, thread = _start_server(monkeypatch, config_path, socket_path)
+
+    try:
+        code = client.forward(
+            socket_path,
+            {
+                "command": "diff",
+                "config": config_path,
+                "field": ".*",
+                "log": "error",
+                "color": "no",
+                "cwd": os.getcwd(),
+                "env": dict(os.environ),
+            },
+        )
+    finally:
+        unix_server.shutdown()
+        thread.join()
+        loader.retain_included_files(False)
+        logger.override_logger(saved_logger)
+        colors.set_enabled(True)
+
+    output = capsys.readouterr().err
+    assert code == 0
+    assert "-old" in output and "+new" in output
+    assert (tmp_path / "dst").read_text() == "old\n"
+    assert not os.path.exists(socket_path)
+    assert client.forward(socket_path, {}) is None
@@ -0,0 +1,37 @@
+import pytest
+
+from dots import targets
+from dots.plugins.plugin import Output
+from tests.tests_common import disable_log
+
+
+def test_home_is_rewritten_for_each_target():
+    home = "/home/me"
+    home_target = targets.parse_target("/srv/homes/alice")
+    rootfs_target = targets.parse_target("/srv/rootfs:/home/bob")
+
+    assert (
+        targets.target_path("/home/me/.bashrc", home_target, home)
+        == "/srv/homes/alice/.bashrc"
+    )
+    assert targets.target_path("/etc/motd", home_target, home) is None
+    assert (
+        targets.target_path("/home/me/.bashrc", rootfs_target, home)
+        == "/srv/rootfs/home/bob/.bashrc"
+    )
+    assert (
+        targets.target_path("/etc/motd", rootfs_target, home) == "/srv/rootfs/etc/motd"
+    )
+    assert targets.target_path("/home/meow", home_target, home) is None
+
+
+def test_links_cannot_be_placed_into_targets(disable_log):
+    rendered = [
+        targets._Rendered(Output("lines", "/home/me/.bashrc", lines=["x\n"]), "h"),
+        targets._Rendered(Output("link", "/home/me/.vim", "/home/me/dots/vim"), None),
+    ]
+
+    with pytest.raises(AssertionError, match="/home/me/.vim"):
+        targets._check_portable(rendered, "/home/me")
+
+    targets._check_portable(rendered[:1], "/home/me")
@@ -0,0 +1,58 @@
+import os
+
+from dots import watch
+from dots.util import watcher
+
+
+class _Config:
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def to_dict(self):
+        return {"value": self.value}
+
+
+class _Plugin:
+    def __init__(self, inputs, value=None) -> None:
+        self._inputs = inputs
+        self.config = _Config(value)
+
+    def inputs(self):
+        return self._inputs
+
+
+def test_polling_watcher_detects_changes(tmp_path):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    (tree / "a").write_text("a\n")
+    single = tmp_path / "single"
+    single.write_text("s\n")
+
+    polling = watcher.PollingWatcher(interval=0.01)
+    polling.set_paths([str(single)], [str(tree)])
+
+    assert polling.wait(0.05) == set()
+
+    (tree / "a").write_text("changed\n")
+    (tree / "b").write_text("new\n")
+    assert polling.wait(1) == {str(tree / "a"), str(tree / "b")}
+
+    os.remove(single)
+    assert polling.wait(1) == {str(single)}
+    assert polling.wait(0.05) == set()
+
+
+def test_only_affected_plugins_are_applied(tmp_path):
+    source = str(tmp_path / "src")
+    plugins = [
+        ("dir", _Plugin([source])),
+        ("other", _Plugin([str(tmp_path / "other")])),
+        ("reconfigured", _Plugin([], value=2)),
+    ]
+    old_configs = {"dir": {"value": None}, "other": {"value": None}}
+
+    affected = watch._affected_plugins(
+        plugins, old_configs, {os.path.join(source, "file")}
+    )
+
+    assert [name for name, _ in affected] == ["dir", "reconfigured"]
@@ -23,7 +23,7 @@ def dot_root():
 
 @pytest.fixture(scope="session")
 def disable_log():
-    logger.init_logger(logger.StdErrLogger())
+    logger.override_logger(logger.StdErrLogger())
     with logger.logger().silent():
         yield
 
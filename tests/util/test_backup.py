@@ -0,0 +1,37 @@
+from dots.util import actions
+from dots.util.backup import BackupStore
+from tests.tests_common import disable_log
+
+
+def test_rollback_restores_overwritten_removed_and_created_paths(tmp_path, disable_log):
+    home = tmp_path / "home"
+    (home / "tree").mkdir(parents=True)
+    (home / "rc").write_text("old rc\n")
+    (home / "tree" / "a").write_text("a\n")
+    (home / "tree" / "b").write_text("a\n")
+
+    store = BackupStore(str(tmp_path / "state"))
+    run_id = store.start_run()
+
+    for action in [
+        actions.WriteFile(str(home / "rc"), ["new rc\n"]),
+        actions.WriteFile(str(home / "created"), ["created\n"]),
+        actions.MakeDir(str(home / "new" / "sub")),
+        actions.WriteFile(str(home / "new" / "sub" / "file"), ["file\n"]),
+        actions.Remove(str(home / "tree")),
+    ]:
+        store.save(action)
+        action.perform()
+
+    assert store.finish() == run_id
+    assert store.runs() == [run_id]
+    # Equal contents are stored once
+    assert len(list((tmp_path / "state").rglob("objects/*/*"))) == 2
+
+    store.rollback(run_id)
+
+    assert (home / "rc").read_text() == "old rc\n"
+    assert not (home / "created").exists()
+    assert not (home / "new").exists()
+    assert (home / "tree" / "a").read_text() == "a\n"
+    assert (home / "tree" / "b").read_text() == "a\n"
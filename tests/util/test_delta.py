@@ -0,0 +1,64 @@
+import io
+import os
+
+from dots import context, dottools
+from dots.config import builder
+from dots.util import actions, delta, executor
+from tests.tests_common import disable_log
+
+
+def test_only_changed_blocks_are_written(tmp_path):
+    path = tmp_path / "file"
+    old = b"a" * 4 + b"b" * 4 + b"c" * 4
+    path.write_bytes(old)
+
+    assert delta.patch_file(str(path), io.BytesIO(b"aaaaXbbbcccc"), 4) == 4
+    assert path.read_bytes() == b"aaaaXbbbcccc"
+
+    assert delta.patch_file(str(path), io.BytesIO(b"aaaaXbbbcc"), 4) == 0
+    assert path.read_bytes() == b"aaaaXbbbcc"
+
+    assert delta.patch_file(str(path), io.BytesIO(b"aaaaXbbbccccdd"), 4) == 6
+    assert path.read_bytes() == b"aaaaXbbbccccdd"
+
+
+def test_dir_updates_files_in_place_with_their_mode(tmp_path, disable_log):
+    context.override_context(
+        context.Context(
+            config_path=str(tmp_path / "conf" / "config.yaml"),
+            dottools_root=str(tmp_path),
+            dry_run=False,
+        )
+    )
+    (tmp_path / "src").mkdir()
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "src" / "script").write_text("#!/bin/sh\necho new\n")
+    (tmp_path / "dst" / "script").write_text("#!/bin/sh\necho old\n")
+    os.chmod(tmp_path / "src" / "script", 0o755)
+    os.chmod(tmp_path / "dst" / "script", 0o644)
+
+    plugins = dottools.create_plugins(
+        builder.create_config(
+            {
+                "dir": {
+                    "plug.Dir": {
+                        "src": str(tmp_path / "src"),
+                        "dst": str(tmp_path / "dst"),
+                        "delta": {"min-size": 0, "block-size": 4},
+                    }
+                }
+            }
+        )
+    )
+
+    with executor.executor().collect() as collected:
+        plugins[0][1].build()
+        list(plugins[0][1].difference())
+        plugins[0][1].apply()
+
+    assert [type(action) for action in collected] == [actions.DeltaCopyFile]
+
+    dottools.run_plugins(plugins, "apply")
+
+    assert (tmp_path / "dst" / "script").read_text() == "#!/bin/sh\necho new\n"
+    assert os.stat(tmp_path / "dst" / "script").st_mode & 0o777 == 0o755
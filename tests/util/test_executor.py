@@ -0,0 +1,68 @@
+import pytest
+
+from dots import context
+from dots.util import actions
+from dots.util.executor import Executor
+from tests.tests_common import disable_log
+
+
+def test_batch_creates_each_directory_once_and_removes_last(tmp_path, disable_log):
+    context.override_context(
+        context.Context(
+            config_path=str(tmp_path / "conf" / "config.yaml"),
+            dottools_root=str(tmp_path),
+            dry_run=False,
+        )
+    )
+
+    stale = tmp_path / "stale"
+    stale.write_text("stale\n")
+
+    executor = Executor(max_workers=4)
+    performed = []
+
+    class Recorded(actions.WriteFile):
+        def perform(self) -> None:
+            performed.append(self.target)
+            super().perform()
+
+    with executor.batch():
+        executor.submit(actions.Remove(str(stale)))
+        executor.submit(Recorded(str(tmp_path / "a" / "b" / "1"), ["1\n"]))
+        executor.submit(Recorded(str(tmp_path / "a" / "b" / "2"), ["2\n"]))
+        executor.submit(Recorded(str(tmp_path / "a" / "3"), ["3\n"]))
+        assert stale.exists()
+
+    assert sorted(performed) == sorted(
+        str(tmp_path / path) for path in ["a/b/1", "a/b/2", "a/3"]
+    )
+    assert (tmp_path / "a" / "b" / "2").read_text() == "2\n"
+    assert not stale.exists()
+
+    stages = Executor._stages(  # pylint: disable=protected-access
+        [actions.WriteFile(str(tmp_path / "x" / "y" / "z"), [])]
+        + [actions.WriteFile(str(tmp_path / "x" / "w"), [])]
+    )
+    assert [action.target for action in stages[0]] == [str(tmp_path / "x" / "y")]
+
+
+def test_failed_plugin_drops_only_its_own_actions(tmp_path, disable_log):
+    context.override_context(
+        context.Context(
+            config_path=str(tmp_path / "conf" / "config.yaml"),
+            dottools_root=str(tmp_path),
+            dry_run=False,
+        )
+    )
+    executor = Executor()
+
+    with pytest.raises(RuntimeError), executor.batch():
+        with executor.owner("done"):
+            executor.submit(actions.WriteFile(str(tmp_path / "done"), ["1\n"]))
+
+        with executor.owner("failed"):
+            executor.submit(actions.WriteFile(str(tmp_path / "failed"), ["2\n"]))
+            raise RuntimeError("plugin failed")
+
+    assert (tmp_path / "done").read_text() == "1\n"
+    assert not (tmp_path / "failed").exists()
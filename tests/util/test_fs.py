@@ -0,0 +1,66 @@
+from dots import context
+from dots.util import actions, fs
+from dots.util.executor import executor
+from tests.tests_common import disable_log
+
+
+def test_binary_and_large_files_are_not_diffed(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+
+    src.write_bytes(b"\x00\x01\x02")
+    dst.write_bytes(b"\x00\x01")
+    assert fs.is_binary(str(src))
+    assert fs.files_difference(str(src), str(dst)) == [
+        "binary files differ (size 2 → 3)\n"
+    ]
+
+    dst.write_bytes(b"\x00\x01\x02")
+    fs.reset_stat_cache()
+    assert fs.files_difference(str(src), str(dst)) == []
+
+    src.write_text("a\n" * 10)
+    dst.write_text("b\n" * 10)
+    fs.reset_stat_cache()
+    assert not fs.is_binary(str(src))
+    assert fs.files_difference(str(src), str(dst), max_text_size=10) == [
+        "large files differ (size 20 → 20)\n"
+    ]
+    assert len(fs.files_difference(str(src), str(dst))) > 1
+
+
+def test_stat_cache_is_invalidated_by_actions(tmp_path, disable_log):
+    context.override_context(
+        context.Context(
+            config_path=str(tmp_path / "conf" / "config.yaml"),
+            dottools_root=str(tmp_path),
+            dry_run=False,
+        )
+    )
+    directory = tmp_path / "dir"
+    path = directory / "file"
+    fs.reset_stat_cache()
+
+    assert not fs.stat_cache().exists(str(path))
+
+    with executor().batch():
+        fs.write_lines(["content\n"], str(path))
+
+    assert fs.stat_cache().isfile(str(path))
+    assert fs.stat_cache().isdir(str(directory))
+    assert fs.stat_cache().size(str(path)) == 8
+
+    executor().submit(actions.Remove(str(directory)))
+
+    assert not fs.stat_cache().exists(str(directory))
+    assert not fs.stat_cache().exists(str(path))
+
+    # The directory itself is not cached, what is under it is
+    path.parent.mkdir()
+    path.write_text("content\n")
+    fs.reset_stat_cache()
+    assert fs.stat_cache().isfile(str(path))
+
+    executor().submit(actions.Remove(str(directory)))
+
+    assert not fs.stat_cache().exists(str(path))
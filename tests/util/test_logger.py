@@ -0,0 +1,65 @@
+from dots.util import colors, diff
+from dots.util.logger import StdErrLogger, Tags
+
+
+def test_messages_are_written_on_flush_and_errors(capsys):
+    log = StdErrLogger([Tags.INFO, Tags.ERROR], use_colors=False)
+
+    log.info("first")
+    assert capsys.readouterr().err == ""
+
+    log.flush()
+    assert "first" in capsys.readouterr().err
+
+    log.info("second")
+    log.error("failed")
+    output = capsys.readouterr().err
+    assert output.index("second") < output.index("failed")
+
+
+def test_disabled_colors_keep_text_and_diff_plain():
+    colors.set_enabled(False)
+
+    try:
+        assert colors.fmt("text", "red", font="bold") == "text"
+        assert list(diff.get_diff_lines(["a b\n"], ["a c\n"]))[-2:] == [
+            "-a b\n",
+            "+a c\n",
+        ]
+    finally:
+        colors.set_enabled(True)
+
+    assert colors.fmt("text", "red") != "text"
+
+
+def test_indentation_and_silence_are_thread_local(capsys):
+    import threading
+    from concurrent import futures
+    from dots.util.executor import submit_in_context
+
+    log = StdErrLogger([Tags.INFO], use_colors=False)
+    silenced = threading.Event()
+    logged = threading.Event()
+
+    def log_silenced():
+        with log.silent():
+            silenced.set()
+            logged.wait()
+
+    with log.indent(label="outer"), futures.ThreadPoolExecutor(2) as pool:
+        silencer = pool.submit(log_silenced)
+        silenced.wait()
+
+        def log_inner():
+            with log.indent(label="inner"):
+                log.info("inside")
+
+        submit_in_context(pool, log_inner).result()
+        logged.set()
+        silencer.result()
+        log.info("outside")
+
+    log.flush()
+    output = capsys.readouterr().err
+    assert "--------[outer/inner] inside" in output
+    assert "----[outer] outside" in output
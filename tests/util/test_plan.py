@@ -0,0 +1,48 @@
+import pytest
+
+from dots.util import actions, plan
+from tests.tests_common import disable_log
+
+
+def test_saved_plan_is_refused_when_target_changes(tmp_path, disable_log):
+    target = tmp_path / "file"
+    target.write_text("old\n")
+
+    plan.start_recording()
+    plan.record(actions.WriteFile(str(target), ["new\n"]))
+    path = str(tmp_path / "plan.json")
+    plan.save(path, plan.stop_recording())
+
+    loaded = plan.load(path)
+    plan.verify(loaded)
+    assert loaded[0].lines == ["new\n"]
+
+    target.write_text("changed\n")
+
+    with pytest.raises(plan.StalePlan):
+        plan.verify(plan.load(path))
+
+
+def test_saved_plan_is_applied_without_config(monkeypatch, tmp_path, disable_log):
+    from dots import __main__, context
+    from dots.util import colors, logger
+
+    target = tmp_path / "file"
+    target.write_text("old\n")
+
+    plan.start_recording()
+    plan.record(actions.WriteFile(str(target), ["new\n"]))
+    path = str(tmp_path / "plan.json")
+    plan.save(path, plan.stop_recording())
+
+    monkeypatch.delenv(__main__.env.CONFIG_FILE_PATH_ENV_VAR, raising=False)
+    monkeypatch.setattr("sys.argv", ["dots", "--socket", "", "apply", "--plan", path])
+    monkeypatch.setattr(logger, "_GLOBAL_LOGGER", None)
+    monkeypatch.setattr(context, "_GLOBAL_CONTEXT", None)
+
+    try:
+        __main__.main(__main__._parse_args())
+    finally:
+        colors.set_enabled(True)
+
+    assert target.read_text() == "new\n"
@@ -0,0 +1,74 @@
+import json
+
+from dots.util.profiler import Profiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+
+    with profiler.phase("phase"):
+        pass
+
+    assert not profiler.records()
+
+
+def test_records_are_accumulated_and_sorted(tmp_path):
+    profiler = Profiler(enabled=True)
+    profiler.record("cheap", 0.1, 0.1)
+    profiler.record("expensive", 1.0, 0.5)
+    profiler.record("cheap", 0.2, 0.1)
+
+    with profiler.phase("measured"):
+        pass
+
+    records = profiler.records()
+    assert [record["phase"] for record in records][:2] == ["expensive", "cheap"]
+    assert records[1]["calls"] == 2
+    assert abs(records[1]["wall"] - 0.3) < 1e-9
+    assert records[2]["phase"] == "measured"
+
+    path = tmp_path / "profile.json"
+    profiler.dump_json(str(path))
+
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file)["phases"] == records
+
+
+class _RecordingProbe:
+    name = "recording"
+
+    def __init__(self):
+        self.calls = []
+
+    def start(self, name):
+        self.calls.append(("start", name))
+
+    def stop(self, name):
+        self.calls.append(("stop", name))
+
+    def records(self):
+        return None
+
+
+def test_probes_run_only_in_outermost_phases():
+    probe = _RecordingProbe()
+    profiler = Profiler(enabled=True, probes=[probe])
+
+    with profiler.phase("outer"):
+        with profiler.phase("inner"):
+            pass
+
+    with profiler.phase("other"):
+        pass
+
+    assert probe.calls == [
+        ("start", "outer"),
+        ("stop", "outer"),
+        ("start", "other"),
+        ("stop", "other"),
+    ]
+    assert {record["phase"] for record in profiler.records()} == {
+        "outer",
+        "inner",
+        "other",
+    }
@@ -0,0 +1,32 @@
+import json
+
+from dots.util.logger import StdErrLogger
+from dots.util.trace import TraceSink
+
+
+def test_labeled_indents_are_recorded_as_spans(tmp_path):
+    logger = StdErrLogger()
+    sink = TraceSink()
+    logger.set_span_sink(sink)
+
+    with logger.indent(label="plugin"):
+        with logger.indent():
+            with logger.indent(label="merge"):
+                pass
+
+    events = sink.events()
+    assert [(event["ph"], event["name"]) for event in events] == [
+        ("B", "plugin"),
+        ("B", "merge"),
+        ("E", "merge"),
+        ("E", "plugin"),
+    ]
+    assert [event["ts"] for event in events] == sorted(event["ts"] for event in events)
+
+    path = tmp_path / "trace.json"
+    sink.write(str(path))
+
+    with open(path, encoding="utf-8") as file:
+        trace = json.load(file)
+
+    assert trace["traceEvents"][1:] == events
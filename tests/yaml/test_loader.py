@@ -0,0 +1,126 @@
+import os
+
+from dots.yaml import loader
+from tests.tests_common import disable_log
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def _make_config(root):
+    _write(
+        os.path.join(root, "conf", "root.yaml"),
+        "a: !include frag/a.yaml\n"
+        "b: !include {pathname: frag/b.yaml}\n"
+        "c: [!include frag/a.yaml, !include frag/c.yaml]\n",
+    )
+    _write(os.path.join(root, "frag", "a.yaml"), "x: [1, 2]\ny: !eval 2 * 3\n")
+    _write(os.path.join(root, "frag", "b.yaml"), "z: !include frag/c.yaml\n")
+    _write(os.path.join(root, "frag", "c.yaml"), "_from: {k: v}\nk: w\n")
+
+    return os.path.join(root, "conf", "root.yaml")
+
+
+def test_include_graph(disable_log, tmp_path):
+    root = str(tmp_path)
+    config = _make_config(root)
+    loader.add_common_yaml_constructors(root, {})
+
+    graph = loader.include_graph(config, root)
+
+    assert graph == {
+        config: [
+            os.path.join(root, "frag", "a.yaml"),
+            os.path.join(root, "frag", "b.yaml"),
+            os.path.join(root, "frag", "c.yaml"),
+        ],
+        os.path.join(root, "frag", "a.yaml"): [],
+        os.path.join(root, "frag", "b.yaml"): [os.path.join(root, "frag", "c.yaml")],
+        os.path.join(root, "frag", "c.yaml"): [],
+    }
+
+
+def test_parallel_load_is_same_as_serial(disable_log, tmp_path):
+    root = str(tmp_path)
+    config = _make_config(root)
+    loader.add_common_yaml_constructors(root, {})
+
+    assert loader.load_rich_yaml_from(config, jobs=2) == loader.load_rich_yaml_from(
+        config
+    )
+
+
+def test_pure_expressions_are_evaluated_once(disable_log, tmp_path):
+    root = str(tmp_path)
+    calls = []
+    _write(
+        os.path.join(root, "conf.yaml"),
+        "a: !eval-pure count()\n"
+        "b: !eval-pure count()\n"
+        "c: !eval count()\n"
+        "d: !eval count()\n",
+    )
+    loader.add_common_yaml_constructors(
+        root, {"count": lambda: calls.append(None) or len(calls)}
+    )
+
+    loaded = loader.load_rich_yaml_from(os.path.join(root, "conf.yaml"))
+
+    assert [loaded[key] for key in "abcd"] == [1, 1, 2, 3]
+    assert len(calls) == 3
+
+
+def test_env_vars_read_by_workers_are_recorded(disable_log, tmp_path):
+    root = str(tmp_path)
+    _write(
+        os.path.join(root, "conf", "root.yaml"),
+        "a: !include frag/a.yaml\nb: !include frag/b.yaml\n",
+    )
+    _write(os.path.join(root, "frag", "a.yaml"), "x: !env DOTS_TEST_WORKER_VAR\n")
+    _write(os.path.join(root, "frag", "b.yaml"), "y: 1\n")
+    loader.add_common_yaml_constructors(root, {})
+
+    loader.load_rich_yaml_from(os.path.join(root, "conf", "root.yaml"), jobs=2)
+
+    assert "DOTS_TEST_WORKER_VAR" in loader.env_vars_read()
+
+
+def test_reload_parses_only_invalidated_files(monkeypatch, disable_log, tmp_path):
+    root = str(tmp_path)
+    names = ["a", "b", "c"]
+    _write(
+        os.path.join(root, "conf", "root.yaml"),
+        "".join(f"{name}: !include frag/{name}.yaml\n" for name in names),
+    )
+    for name in names:
+        _write(os.path.join(root, "frag", f"{name}.yaml"), f"x: {name}\n")
+
+    parsed_in_pool = []
+    parse_in_pool = loader._parse_in_pool
+
+    def recording_parse_in_pool(paths, jobs):
+        parsed_in_pool.append(sorted(os.path.basename(path) for path in paths))
+        return parse_in_pool(paths, jobs)
+
+    monkeypatch.setattr(loader, "_parse_in_pool", recording_parse_in_pool)
+    loader.add_common_yaml_constructors(root, {})
+    loader.retain_included_files(True)
+    config = os.path.join(root, "conf", "root.yaml")
+
+    try:
+        loader.load_rich_yaml_from(config, jobs=2)
+        changed = [os.path.join(root, "frag", f"{name}.yaml") for name in "ab"]
+        for path in changed:
+            _write(path, "x: changed\n")
+
+        loader.invalidate_included_files(changed)
+        reloaded = loader.load_rich_yaml_from(config, jobs=2)
+    finally:
+        loader.retain_included_files(False)
+
+    assert parsed_in_pool == [["a.yaml", "b.yaml", "c.yaml"], ["a.yaml", "b.yaml"]]
+    assert reloaded["a"]["x"] == "changed" and reloaded["c"]["x"] == "c"